@@ -0,0 +1,89 @@
+"""Per-PO serialization cost: response_model validation vs the canonical fast path.
+
+Usage (from backend/):  python bench_po_serialization.py [--colours 24] [--sizes 12] [--number 2000]
+
+"validated" mirrors what FastAPI did for response_model=PurchaseOrder:
+validate the stored dict into the model (running every field validator),
+encode it with jsonable_encoder and render with JSONResponse. "fast" is
+what GET /pos and GET /pos/{id} now do for documents at PO_SCHEMA_VERSION:
+drop schema_version and hand the dict straight to ORJSONResponse.
+"""
+import argparse
+import os
+import sys
+import timeit
+
+# server.py connects lazily, so importing it needs no running MongoDB
+os.environ.setdefault('UPLOAD_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from server import POCreate, PurchaseOrder, build_po_document, po_response_data
+
+
+def sample_po(colours: int, sizes: int) -> dict:
+    size_names = [f"S{i}" for i in range(sizes)]
+    colour_names = [f"Colour {i}" for i in range(colours)]
+    return POCreate(**{
+        "po_number": "NA/181025/0001",
+        "po_date": "2025-10-18",
+        "bill_to": {"company": "Bill To Co", "address_lines": ["Line 1", "Line 2", "Line 3"]},
+        "buyer": {"company": "Newline Apparel", "address_lines": ["61, GKD Nagar, PN Palayam"]},
+        "supplier": {"company": "Sree Rajkondal Export Enterprises", "address_lines": ["Tiruppur"]},
+        "delivery_date": "2025-11-30",
+        "delivery_terms": "FOB",
+        "payment_terms": "30 days",
+        "order_lines": [
+            {
+                "style_code": f"ST{i}", "product_description": "Crew neck tee", "fabric_gsm": "180",
+                "colors": ", ".join(colour_names[:4]), "size_range": ", ".join(size_names),
+                "quantity": 1200, "unit_price": 145.5
+            }
+            for i in range(6)
+        ],
+        "size_colour_breakdown": {
+            "sizes": size_names,
+            "colors": [{"name": name, "unitPrice": 140 + i} for i, name in enumerate(colour_names)],
+            "values": {name: {size: 25 for size in size_names} for name in colour_names},
+            "grand_total": 25 * sizes * colours
+        },
+        "packing_instructions": {"folding_instruction": "Standard", "packing_instruction": "10 per carton"},
+        "other_terms": {"qc": "AQL 2.5", "notes": "Handle with care"},
+        "authorisation": {"buyer_company": "Newline Apparel", "supplier_company": "Sree Rajkondal"},
+        "tax_details": {"cgst_percentage": 2.5, "sgst_percentage": 2.5}
+    }).model_dump()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--colours', type=int, default=24)
+    parser.add_argument('--sizes', type=int, default=12)
+    parser.add_argument('--number', type=int, default=2000)
+    args = parser.parse_args()
+
+    _, stored = build_po_document(sample_po(args.colours, args.sizes))
+    stored.pop('search_keys')  # excluded by PO_READ_PROJECTION
+
+    def validated():
+        po = dict(stored)
+        po.pop('schema_version')
+        JSONResponse(jsonable_encoder(PurchaseOrder(**po))).body
+
+    def fast():
+        ORJSONResponse(po_response_data(dict(stored))).body
+
+    size = len(ORJSONResponse(po_response_data(dict(stored))).body)
+    print(f"PO with {args.colours} colours x {args.sizes} sizes, 6 order lines ({size / 1024:.1f} KiB JSON)")
+    results = {}
+    for name, fn in (("validated", validated), ("fast", fast)):
+        fn()
+        best = min(timeit.repeat(fn, number=args.number, repeat=5)) / args.number
+        results[name] = best
+        print(f"  {name:>9}: {best * 1e6:8.1f} µs per PO")
+    print(f"  speedup:   {results['validated'] / results['fast']:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
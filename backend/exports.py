@@ -0,0 +1,78 @@
+"""Row flattening for the streaming PO export (NDJSON and CSV)."""
+import csv
+import io
+import json
+from typing import Any, Dict, Iterable, List
+
+from po_totals import color_name, color_unit_price
+
+
+PO_HEADER_COLUMNS = ["id", "doc_type", "po_number", "po_date", "delivery_date", "supplier", "currency"]
+
+LINE_COLUMNS = PO_HEADER_COLUMNS + [
+    "style_code", "product_description", "fabric_gsm", "quantity", "unit", "po_subtotal", "po_grand_total",
+]
+
+CELL_COLUMNS = PO_HEADER_COLUMNS + ["color", "size", "quantity", "unit_price", "amount"]
+
+# Internal fields that are never exported
+EXPORT_PROJECTION = {"_id": 0, "search_keys": 0}
+
+
+def po_header(po: Dict[str, Any]) -> List[Any]:
+    return [
+        po.get('id'),
+        po.get('doc_type', 'PO'),
+        po.get('po_number'),
+        po.get('po_date'),
+        po.get('delivery_date'),
+        (po.get('supplier') or {}).get('company'),
+        po.get('currency'),
+    ]
+
+
+def po_line_rows(po: Dict[str, Any]) -> Iterable[List[Any]]:
+    """One CSV row per order line"""
+    header = po_header(po)
+    totals = po.get('totals') or {}
+    for line in po.get('order_lines') or []:
+        yield header + [
+            line.get('style_code'),
+            line.get('product_description'),
+            line.get('fabric_gsm'),
+            line.get('quantity'),
+            line.get('unit'),
+            totals.get('subtotal'),
+            totals.get('grand_total'),
+        ]
+
+
+def po_cell_rows(po: Dict[str, Any]) -> Iterable[List[Any]]:
+    """One CSV row per colour x size cell of the size/colour matrix"""
+    header = po_header(po)
+    breakdown = po.get('size_colour_breakdown') or {}
+    values = breakdown.get('values') or {}
+    for color in breakdown.get('colors') or []:
+        name = color_name(color)
+        unit_price = color_unit_price(color)
+        row_values = values.get(name) or {}
+        for size in breakdown.get('sizes') or []:
+            quantity = int(row_values.get(size) or 0)
+            yield header + [name, size, quantity, unit_price, round(quantity * unit_price, 2)]
+
+
+CSV_LAYOUTS = {
+    "lines": (LINE_COLUMNS, po_line_rows),
+    "cells": (CELL_COLUMNS, po_cell_rows),
+}
+
+
+def csv_chunk(rows: Iterable[List[Any]]) -> str:
+    """Render rows as CSV text"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+def ndjson_line(po: Dict[str, Any]) -> str:
+    return json.dumps(po, default=str, ensure_ascii=False) + "\n"
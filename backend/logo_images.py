@@ -0,0 +1,76 @@
+"""Logo image pipeline: downscaled, metadata-free print and screen variants.
+
+process_logo is CPU-bound and blocking; run it in a thread pool.
+"""
+import io
+from typing import Dict, NamedTuple
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+
+class LogoVariant(NamedTuple):
+    data: bytes
+    content_type: str
+    width: int
+    height: int
+
+
+# Bounding boxes in pixels. The document header shows the logo at most
+# 120pt x 38pt, so "print" is ~600 dpi at that size and "screen" ~2x.
+VARIANT_SIZES = {
+    "print": (1000, 320),
+    "screen": (320, 100),
+}
+
+# Sources are rejected before decoding if larger than this; a tiny
+# compressed file can declare enormous dimensions (decompression bomb)
+MAX_SOURCE_SIDE = 10000
+MAX_SOURCE_PIXELS = 40_000_000
+
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+
+
+def _encode(image: Image.Image, fmt: str) -> bytes:
+    # Saving without exif/icc/info drops all source metadata
+    buffer = io.BytesIO()
+    if fmt == "PNG":
+        image.save(buffer, format="PNG", optimize=True)
+    elif fmt == "JPEG":
+        image.save(buffer, format="JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    else:
+        image.save(buffer, format="WEBP", quality=WEBP_QUALITY, method=6)
+    return buffer.getvalue()
+
+
+def process_logo(contents: bytes) -> Dict[str, LogoVariant]:
+    """Build print/screen variants, each as PNG-or-JPEG plus WebP.
+
+    Images with transparency stay PNG so the logo blends with the page;
+    opaque images become JPEG. Raises ValueError for unreadable images.
+    """
+    try:
+        source = Image.open(io.BytesIO(contents))
+        width, height = source.size
+        if max(width, height) > MAX_SOURCE_SIDE or width * height > MAX_SOURCE_PIXELS:
+            raise ValueError(
+                f"Image is too large ({width}x{height}); at most {MAX_SOURCE_SIDE}px per side "
+                f"and {MAX_SOURCE_PIXELS // 1_000_000} megapixels"
+            )
+        source.load()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise ValueError(f"File is not a valid image: {str(e)}")
+
+    source = ImageOps.exif_transpose(source)
+    has_alpha = source.mode in ("RGBA", "LA", "PA") or (source.mode == "P" and "transparency" in source.info)
+    source = source.convert("RGBA" if has_alpha else "RGB")
+    base_format, base_type = ("PNG", "image/png") if has_alpha else ("JPEG", "image/jpeg")
+
+    variants = {}
+    for name, box in VARIANT_SIZES.items():
+        image = source.copy()
+        # thumbnail only ever shrinks, so small logos keep their size
+        image.thumbnail(box, Image.LANCZOS)
+        variants[name] = LogoVariant(_encode(image, base_format), base_type, image.width, image.height)
+        variants[f"{name}_webp"] = LogoVariant(_encode(image, "WEBP"), "image/webp", image.width, image.height)
+    return variants
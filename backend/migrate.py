@@ -0,0 +1,184 @@
+"""Offline data migrations.
+
+Usage (from backend/):
+
+    python migrate.py bootstrap [--force] [--lock-timeout SECONDS]
+    python migrate.py canonicalize-pos [--batch-size 500] [--restart]
+
+bootstrap creates indexes, seeds default settings/buyer and runs the
+backfills that used to run in every worker's startup hook. Run it once per
+deploy before starting the web workers; it takes a lock in the `locks`
+collection so concurrent runs (e.g. several replicas starting at once)
+wait for the first one and then skip, and records BOOTSTRAP_VERSION so
+workers' /api/health/ready reports ready. Only the indexes and the lock are
+required: any other step that fails is logged and recorded, the command
+still exits 0 so the web workers start, and the next run retries it.
+
+canonicalize-pos rewrites every stored PO/PI into the current canonical
+schema (PO_SCHEMA_VERSION): colours as ColorRow objects, order line
+colours/size ranges as lists, doc_type set, UTC ISO timestamps, stored
+totals and search keys. It works in _id order in batches and records the
+last processed _id in the `migrations` collection, so an interrupted run
+picks up where it stopped. Each replace is conditional on the revision
+that was read; documents edited mid-run are left for the next run.
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ReplaceOne
+
+import server
+from mongo_lock import LockNotAcquired, MongoLock
+from server import (
+    BOOTSTRAP_LOCK_LEASE, BOOTSTRAP_STATE_ID, BOOTSTRAP_VERSION, PO_SCHEMA_VERSION, PO_TIMESTAMP_FIELDS,
+    build_po_document, revision_filter, run_bootstrap, utc_timestamp
+)
+
+CANONICALIZE_POS = "canonicalize_pos"
+BOOTSTRAP_LOCK = "bootstrap"
+
+
+def canonical_po_document(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Stored form of a PO as build_po_document writes it today"""
+    po = {k: v for k, v in doc.items() if k != '_id'}
+    po.setdefault('doc_type', 'PO')
+    # Naive timestamps (old string format or BSON dates) are UTC; offsets
+    # such as +05:30 are converted so stored strings compare in time order
+    for field in PO_TIMESTAMP_FIELDS:
+        if po.get(field) is not None:
+            po[field] = utc_timestamp(po[field])
+    # Without created_at the list would sort the PO as brand new; the
+    # ObjectId still records when it was inserted (build_po_document
+    # falls back to now otherwise)
+    if po.get('created_at') is None and isinstance(doc.get('_id'), ObjectId):
+        po['created_at'] = doc['_id'].generation_time
+    _, canonical = build_po_document(po)
+    return canonical
+
+
+async def canonicalize_pos(batch_size: int = 500, restart: bool = False) -> Dict[str, int]:
+    """Rewrite legacy POs batch by batch; safe to interrupt and rerun"""
+    db = server.db
+    if restart:
+        await db.migrations.delete_one({"_id": CANONICALIZE_POS})
+    state = await db.migrations.find_one({"_id": CANONICALIZE_POS}) or {}
+    resuming = state.get('last_id') is not None
+    counts = {key: state.get(key, 0) if resuming else 0 for key in ("migrated", "conflicts", "failed")}
+
+    query: Dict[str, Any] = {"schema_version": {"$ne": PO_SCHEMA_VERSION}}
+    if resuming:
+        query["_id"] = {"$gt": state['last_id']}
+        logging.info(f"Resuming {CANONICALIZE_POS} after _id {state['last_id']}")
+
+    while True:
+        batch = await db.purchase_orders.find(query).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+
+        requests = []
+        for doc in batch:
+            try:
+                canonical = canonical_po_document(doc)
+            except Exception as e:
+                counts['failed'] += 1
+                logging.error(f"❌ PO {doc.get('id')} ({doc['_id']}) cannot be canonicalized: {str(e)}")
+                continue
+            requests.append(ReplaceOne(
+                {"_id": doc["_id"], "revision": revision_filter(doc.get('revision', 0))},
+                canonical
+            ))
+
+        if requests:
+            result = await db.purchase_orders.bulk_write(requests, ordered=False)
+            counts['migrated'] += result.modified_count
+            counts['conflicts'] += len(requests) - result.matched_count
+
+        last_id = batch[-1]["_id"]
+        query["_id"] = {"$gt": last_id}
+        await db.migrations.update_one(
+            {"_id": CANONICALIZE_POS},
+            {"$set": {"last_id": last_id, **counts, "updated_at": datetime.now(timezone.utc).isoformat()}},
+            upsert=True
+        )
+        logging.info(f"{CANONICALIZE_POS}: {counts['migrated']} migrated so far")
+
+    # Dropping last_id makes a later run rescan for anything edited or failed
+    await db.migrations.update_one(
+        {"_id": CANONICALIZE_POS},
+        {
+            "$set": {**counts, "completed_at": datetime.now(timezone.utc).isoformat()},
+            "$unset": {"last_id": ""}
+        },
+        upsert=True
+    )
+    return counts
+
+
+async def bootstrap(force: bool = False, lock_timeout: Optional[float] = None) -> Optional[List[str]]:
+    """Run run_bootstrap under the bootstrap lock.
+
+    Returns the steps that failed, or None if bootstrap was already current.
+    A run that recorded failed steps counts as not current, so the next
+    deploy retries them.
+    """
+    lock = MongoLock(server.db.locks, BOOTSTRAP_LOCK, BOOTSTRAP_LOCK_LEASE)
+    await lock.acquire(lock_timeout)
+    try:
+        # Whoever held the lock before us may have just finished the same work
+        state = await server.db.migrations.find_one({"_id": BOOTSTRAP_STATE_ID}) or {}
+        version = state.get('version')
+        if not force and not state.get('failed_steps') and version is not None and version >= BOOTSTRAP_VERSION:
+            logging.info(f"Bootstrap already at version {version}; nothing to do")
+            return None
+        return await run_bootstrap()
+    finally:
+        await lock.release()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="PO Generator data migrations")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    boot = commands.add_parser("bootstrap", help="Create indexes, seed defaults and run startup backfills")
+    boot.add_argument("--force", action="store_true", help="Run even if this bootstrap version already completed")
+    boot.add_argument("--lock-timeout", type=float, default=None, help="Give up waiting for the lock after this many seconds")
+
+    canonicalize = commands.add_parser("canonicalize-pos", help="Rewrite stored POs into the canonical schema")
+    canonicalize.add_argument("--batch-size", type=int, default=500)
+    canonicalize.add_argument("--restart", action="store_true", help="Ignore saved progress and scan from the start")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.command == "bootstrap":
+        try:
+            failed_steps = asyncio.run(bootstrap(args.force, args.lock_timeout))
+        except LockNotAcquired as e:
+            logging.error(f"❌ {str(e)}")
+            return 1
+        # Failed optional steps must not keep the web workers from starting
+        if failed_steps:
+            logging.warning(
+                f"⚠️ Bootstrap version {BOOTSTRAP_VERSION} complete with failed steps: {', '.join(failed_steps)}; "
+                "they are retried on the next run"
+            )
+        elif failed_steps is not None:
+            logging.info(f"✅ Bootstrap version {BOOTSTRAP_VERSION} complete")
+        return 0
+    if args.command == "canonicalize-pos":
+        counts = asyncio.run(canonicalize_pos(args.batch_size, args.restart))
+        logging.info(
+            f"✅ {CANONICALIZE_POS} done: {counts['migrated']} migrated, "
+            f"{counts['conflicts']} edited during the run, {counts['failed']} failed"
+        )
+        return 1 if counts['failed'] else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
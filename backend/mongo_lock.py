@@ -0,0 +1,95 @@
+"""Lease-based mutual exclusion across processes, backed by one MongoDB document.
+
+A lock is a document {_id: name, owner, expires_at} in its collection.
+Acquiring it is a single upsert that only matches when the lock is free
+or its lease has run out, so a holder that crashed releases it by simply
+expiring. While held, a background task keeps pushing expires_at forward;
+work that outlives the lease (the task cannot reach MongoDB) may overlap
+with the next holder, so lease_seconds should comfortably exceed a
+renewal hiccup.
+"""
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+
+class LockNotAcquired(Exception):
+    pass
+
+
+class MongoLock:
+    def __init__(self, collection, name: str, lease_seconds: float = 60, poll_interval: float = 2):
+        self.collection = collection
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._renewer: Optional[asyncio.Task] = None
+
+    def _expires_at(self) -> datetime:
+        return datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds)
+
+    async def try_acquire(self) -> bool:
+        """Take the lock if it is free or expired; never waits"""
+        now = datetime.now(timezone.utc)
+        try:
+            await self.collection.find_one_and_update(
+                {"_id": self.name, "$or": [{"expires_at": {"$lt": now}}, {"owner": self.owner}]},
+                {"$set": {"owner": self.owner, "expires_at": self._expires_at(), "acquired_at": now}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # The document exists and is held by someone else
+            return False
+        self._renewer = asyncio.create_task(self._renew())
+        return True
+
+    async def acquire(self, timeout: Optional[float] = None) -> None:
+        """Wait for the lock, polling until timeout (None waits forever)"""
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while not await self.try_acquire():
+            if deadline is not None and loop.time() >= deadline:
+                raise LockNotAcquired(f"Lock {self.name!r} still held after {timeout}s")
+            holder = await self.collection.find_one({"_id": self.name}, {"owner": 1})
+            logger.info(f"Waiting for lock {self.name!r} held by {(holder or {}).get('owner')}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def release(self) -> None:
+        if self._renewer is not None:
+            self._renewer.cancel()
+            try:
+                await self._renewer
+            except asyncio.CancelledError:
+                pass
+            self._renewer = None
+        await self.collection.delete_one({"_id": self.name, "owner": self.owner})
+
+    async def _renew(self) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                result = await self.collection.update_one(
+                    {"_id": self.name, "owner": self.owner},
+                    {"$set": {"expires_at": self._expires_at()}}
+                )
+                if not result.matched_count:
+                    logger.error(f"❌ Lost lock {self.name!r}; another process may now hold it")
+                    return
+            except Exception as e:
+                logger.warning(f"⚠️ Could not renew lock {self.name!r}: {str(e)}")
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.release()
@@ -0,0 +1,104 @@
+"""Connection pool counters fed by PyMongo's CMAP event listener.
+
+Motor runs PyMongo on worker threads, so events arrive on arbitrary
+threads; all counters sit behind one lock. A checkout's wait is the time
+between its "started" and "checked out"/"failed" events, which always
+fire on the same thread, so the start time is kept in a thread-local.
+"""
+import threading
+import time
+from typing import Any, Dict
+
+from pymongo import monitoring
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.checkouts_started = 0
+        self.checkouts = 0
+        self.checkout_failures: Dict[str, int] = {}
+        self.checkins = 0
+        self.connections_created = 0
+        self.connections_closed = 0
+        self.pools_cleared = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _end_wait(self) -> float:
+        started = getattr(self._local, 'started', None)
+        self._local.started = None
+        return time.monotonic() - started if started is not None else 0.0
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.monotonic()
+        with self._lock:
+            self.checkouts_started += 1
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+
+    def connection_checked_out(self, event):
+        waited = self._end_wait()
+        with self._lock:
+            self.checkouts += 1
+            self.waiting -= 1
+            self.total_wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def connection_check_out_failed(self, event):
+        waited = self._end_wait()
+        with self._lock:
+            self.checkout_failures[event.reason] = self.checkout_failures.get(event.reason, 0) + 1
+            self.waiting -= 1
+            self.total_wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checkins += 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_created += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_closed += 1
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pools_cleared += 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters since process start, plus what is open/in use right now"""
+        with self._lock:
+            finished = self.checkouts + sum(self.checkout_failures.values())
+            return {
+                "checkouts_started": self.checkouts_started,
+                "checkouts": self.checkouts,
+                "checkout_failures": dict(self.checkout_failures),
+                "checked_out": self.checkouts - self.checkins,
+                "waiting": self.waiting,
+                "max_waiting": self.max_waiting,
+                "avg_wait_ms": round(self.total_wait_seconds / finished * 1000, 3) if finished else 0.0,
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+                "connections_open": self.connections_created - self.connections_closed,
+                "connections_created": self.connections_created,
+                "connections_closed": self.connections_closed,
+                "pools_cleared": self.pools_cleared,
+            }
@@ -0,0 +1,87 @@
+"""PO/PI number allocation from small per-day counter documents.
+
+Counters live in their own collection, one document per
+(doc_type, prefix, date) holding the last sequence number handed out, so
+there is no single hot document and sequences restart every day (or
+whenever the prefix changes). To keep most allocations off the database
+entirely, each worker leases a block of block_size numbers with one $inc
+and hands them out from memory; numbers left in a block when the worker
+stops or the day rolls over are skipped, never reused.
+"""
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+
+def number_date(now: Optional[datetime] = None) -> str:
+    """DDMMYY segment of a document number"""
+    return (now or datetime.now(timezone.utc)).strftime('%d%m%y')
+
+
+def normalize_prefix(prefix: str) -> str:
+    """Prefix as it appears in the number, e.g. 'NA/' -> 'NA'"""
+    return prefix.rstrip('/')
+
+
+def format_number(prefix: str, date_str: str, sequence: int) -> str:
+    """Compose PREFIX/DDMMYY/XXXX, e.g. NA/181025/0007"""
+    return f"{normalize_prefix(prefix)}/{date_str}/{str(sequence).zfill(4)}"
+
+
+def counter_filter(doc_type: str, prefix: str, date_str: str) -> Dict[str, Any]:
+    return {"doc_type": doc_type, "prefix": normalize_prefix(prefix), "date": date_str}
+
+
+class NumberAllocator:
+    def __init__(self, collection, block_size: int):
+        self.collection = collection
+        self.block_size = max(1, block_size)
+        # (doc_type, prefix, date) -> [next unused, end of block (exclusive)]
+        self._leases: Dict[Tuple[str, str, str], List[int]] = {}
+        self._lock = asyncio.Lock()
+
+    async def reserve_range(self, doc_type: str, prefix: str, date_str: str, count: int) -> Tuple[int, int]:
+        """Atomically claim `count` consecutive numbers; returns (first, last)"""
+        query = counter_filter(doc_type, prefix, date_str)
+        for attempt in range(2):
+            try:
+                result = await self.collection.find_one_and_update(
+                    query,
+                    {"$inc": {"seq": count}},
+                    upsert=True,
+                    return_document=True
+                )
+                break
+            except DuplicateKeyError:
+                # Two first-of-the-day upserts raced; the loser retries as an update
+                if attempt:
+                    raise
+        last = result["seq"]
+        return last - count + 1, last
+
+    async def next_number(self, doc_type: str, prefix: str, date_str: str) -> int:
+        """Next number for doc_type/prefix today, from this worker's leased block"""
+        key = (doc_type, normalize_prefix(prefix), date_str)
+        async with self._lock:
+            # Blocks from earlier days can never be used again
+            for stale in [k for k in self._leases if k[2] != date_str]:
+                del self._leases[stale]
+
+            lease = self._leases.get(key)
+            if lease is None or lease[0] >= lease[1]:
+                first, last = await self.reserve_range(doc_type, prefix, date_str, self.block_size)
+                lease = self._leases[key] = [first, last + 1]
+
+            number = lease[0]
+            lease[0] += 1
+            return number
+
+    async def seed(self, doc_type: str, prefix: str, date_str: str, last_issued: int) -> None:
+        """Make sure the day's sequence continues after `last_issued`"""
+        await self.collection.update_one(
+            counter_filter(doc_type, prefix, date_str),
+            {"$max": {"seq": last_issued}},
+            upsert=True
+        )
@@ -0,0 +1,89 @@
+"""Content-addressed disk cache for rendered PO PDFs.
+
+Entries live at <directory>/<po_id>/<key>.pdf where key hashes the stored
+PO document together with a fingerprint of the current logo and the
+renderer version, so an edited PO, a new logo or a layout change can never
+be served a stale file. Explicit invalidation
+just reclaims the space early. Total size is bounded with LRU eviction on
+file mtime, which get() refreshes on every hit.
+
+All methods do blocking file I/O; call them via asyncio.to_thread.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+class PDFCache:
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def make_key(po: Dict[str, Any], logo_fingerprint: str, render_version: int) -> str:
+        """Hash of the stored document plus the logo and renderer it will be rendered with"""
+        payload = json.dumps(po, sort_keys=True, default=str, ensure_ascii=False)
+        digest = hashlib.sha256(payload.encode('utf-8'))
+        digest.update(b'\0' + logo_fingerprint.encode('utf-8'))
+        digest.update(b'\0' + str(render_version).encode('ascii'))
+        return digest.hexdigest()
+
+    def _po_dir(self, po_id: str) -> Path:
+        # PO ids are UUIDs; never let one escape the cache directory
+        return self.directory / hashlib.sha1(po_id.encode('utf-8')).hexdigest()
+
+    def get(self, po_id: str, key: str) -> Optional[bytes]:
+        path = self._po_dir(po_id) / f"{key}.pdf"
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        os.utime(path)
+        return data
+
+    def put(self, po_id: str, key: str, data: bytes) -> None:
+        po_dir = self._po_dir(po_id)
+        po_dir.mkdir(parents=True, exist_ok=True)
+        # Older revisions of this PO can never be requested again
+        for stale in po_dir.glob('*.pdf'):
+            stale.unlink(missing_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=po_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, po_dir / f"{key}.pdf")
+        self.evict()
+
+    def invalidate(self, po_id: str) -> None:
+        shutil.rmtree(self._po_dir(po_id), ignore_errors=True)
+
+    def clear(self) -> None:
+        for entry in self.directory.iterdir():
+            if entry.is_dir():
+                shutil.rmtree(entry, ignore_errors=True)
+
+    def evict(self) -> None:
+        """Delete least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        total = 0
+        for path in self.directory.glob('*/*.pdf'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+        logging.info(f"PDF cache evicted down to {total} bytes")
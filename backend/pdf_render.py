@@ -0,0 +1,279 @@
+"""Server-side PO/PI PDF rendering with ReportLab.
+
+Lays out the same sections as PODocument.jsx (header with logo, parties,
+meta, order summary, size/colour matrix, tax summary, packing, terms and
+authorisation). render_po_pdf is a plain top-level function taking only
+picklable arguments so it can run inside a ProcessPoolExecutor.
+"""
+import io
+from typing import Any, Dict, List, Optional
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_RIGHT
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import mm
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import Image, KeepTogether, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from po_totals import compute_po_totals
+
+
+# Part of the PDF cache key and ETag: bump on any layout change so cached
+# files and client validators from the old layout stop matching
+RENDER_VERSION = 1
+
+BORDER = colors.HexColor('#D1D5DB')
+HEADER_BG = colors.HexColor('#F5F5F7')
+PAGE_MARGIN = 12 * mm
+CONTENT_WIDTH = A4[0] - 2 * PAGE_MARGIN
+
+_styles = getSampleStyleSheet()
+TITLE = ParagraphStyle('POTitle', parent=_styles['Normal'], fontName='Helvetica-Bold', fontSize=14, leading=17)
+SECTION = ParagraphStyle('POSection', parent=_styles['Normal'], fontName='Helvetica-Bold', fontSize=10, leading=13, spaceAfter=3)
+BODY = ParagraphStyle('POBody', parent=_styles['Normal'], fontName='Helvetica', fontSize=8.5, leading=11)
+BODY_BOLD = ParagraphStyle('POBodyBold', parent=BODY, fontName='Helvetica-Bold')
+BODY_RIGHT = ParagraphStyle('POBodyRight', parent=BODY, alignment=TA_RIGHT)
+
+GRID_STYLE = [
+    ('GRID', (0, 0), (-1, -1), 0.5, BORDER),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('FONTSIZE', (0, 0), (-1, -1), 8.5),
+    ('TOPPADDING', (0, 0), (-1, -1), 4),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+]
+
+
+def format_inr(value: Any) -> str:
+    """Indian digit grouping with two decimals, e.g. Rs. 12,34,567.50"""
+    amount = float(value or 0)
+    sign = '-' if amount < 0 else ''
+    whole, fraction = f"{abs(amount):.2f}".split('.')
+    if len(whole) > 3:
+        head, tail = whole[:-3], whole[-3:]
+        groups = []
+        while len(head) > 2:
+            groups.insert(0, head[-2:])
+            head = head[:-2]
+        if head:
+            groups.insert(0, head)
+        whole = ','.join(groups + [tail])
+    return f"{sign}Rs. {whole}.{fraction}"
+
+
+def text(value: Any, style: ParagraphStyle = BODY) -> Paragraph:
+    """Paragraph for user-supplied text, preserving line breaks"""
+    return Paragraph(escape(str(value or '')).replace('\n', '<br/>'), style)
+
+
+def party_block(title: str, party: Optional[Dict[str, Any]]) -> List[Any]:
+    party = party or {}
+    lines = [Paragraph(title, SECTION), text(party.get('company'), BODY_BOLD)]
+    lines += [text(line) for line in party.get('address_lines') or [] if line]
+    for label, key in (('GSTIN', 'gstin'), ('Contact', 'contact_name'), ('Phone', 'phone'), ('Email', 'email')):
+        if party.get(key):
+            lines.append(text(f"{label}: {party[key]}"))
+    return lines
+
+
+def boxed_pair(left: List[Any], right: List[Any]) -> Table:
+    table = Table([[left, right]], colWidths=[CONTENT_WIDTH / 2 - 3 * mm] * 2, spaceAfter=3 * mm)
+    table.setStyle(TableStyle([
+        ('BOX', (0, 0), (0, 0), 0.75, BORDER),
+        ('BOX', (1, 0), (1, 0), 0.75, BORDER),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('LEFTPADDING', (0, 0), (-1, -1), 6),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+    ]))
+    return table
+
+
+def labelled_rows(title: str, rows: List[tuple]) -> List[Any]:
+    """Section of label/value rows, skipping empty values"""
+    data = [[text(label, BODY_BOLD), text(value)] for label, value in rows if value]
+    if not data:
+        return []
+    table = Table(data, colWidths=[CONTENT_WIDTH * 0.25, CONTENT_WIDTH * 0.75])
+    table.setStyle(TableStyle(GRID_STYLE))
+    return [KeepTogether([Paragraph(title, SECTION), table]), Spacer(1, 3 * mm)]
+
+
+def header(po: Dict[str, Any], logo_bytes: Optional[bytes]) -> Table:
+    doc_type = po.get('doc_type', 'PO')
+    title = [
+        Paragraph('Proforma Invoice' if doc_type == 'PI' else 'Purchase Order', TITLE),
+        text(f"{'PI' if doc_type == 'PI' else 'PO'} No: {po.get('po_number', '')}"),
+    ]
+    logo = ''
+    if logo_bytes:
+        reader = ImageReader(io.BytesIO(logo_bytes))
+        width, height = reader.getSize()
+        scale = min((120 / width) if width else 1, (38 / height) if height else 1, 1)
+        logo = Image(io.BytesIO(logo_bytes), width=width * scale, height=height * scale)
+    table = Table([[title, logo]], colWidths=[CONTENT_WIDTH * 0.6, CONTENT_WIDTH * 0.4], spaceAfter=3 * mm)
+    table.setStyle(TableStyle([
+        ('ALIGN', (1, 0), (1, 0), 'RIGHT'),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('LINEBELOW', (0, 0), (-1, 0), 0.75, BORDER),
+    ]))
+    return table
+
+
+def meta_block(po: Dict[str, Any]) -> Table:
+    rows = [
+        ('PO Date', po.get('po_date')),
+        ('Delivery Date', po.get('delivery_date')),
+        ('Payment Terms', po.get('payment_terms')),
+        ('Delivery Terms', po.get('delivery_terms')),
+    ]
+    table = Table(
+        [[text(label, BODY_BOLD), text(value or 'N/A')] for label, value in rows],
+        colWidths=[(CONTENT_WIDTH / 2 - 3 * mm) * 0.4, (CONTENT_WIDTH / 2 - 3 * mm) * 0.6 - 12]
+    )
+    table.setStyle(TableStyle(GRID_STYLE + [('BACKGROUND', (0, 0), (0, -1), HEADER_BG)]))
+    return table
+
+
+def order_summary(po: Dict[str, Any], totals: Dict[str, Any]) -> List[Any]:
+    lines = po.get('order_lines') or []
+    if not lines:
+        return []
+    breakdown = po.get('size_colour_breakdown') or {}
+    colours = ', '.join(row['name'] for row in totals['color_rows'])
+    sizes = ', '.join(breakdown.get('sizes') or [])
+    data = [['Style Code', 'Description', 'Fabric & GSM', 'Colours', 'Size Range', 'Quantity', 'Total Amount']]
+    for line in lines:
+        data.append([
+            text(line.get('style_code')),
+            text(line.get('product_description')),
+            text(line.get('fabric_gsm')),
+            text(colours),
+            text(sizes),
+            f"{int(line.get('quantity') or 0):,}",
+            format_inr(totals['subtotal']),
+        ])
+    widths = [0.12, 0.24, 0.13, 0.17, 0.12, 0.09, 0.13]
+    table = Table(data, colWidths=[CONTENT_WIDTH * w for w in widths], repeatRows=1)
+    table.setStyle(TableStyle(GRID_STYLE + [
+        ('BACKGROUND', (0, 0), (-1, 0), HEADER_BG),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('ALIGN', (5, 0), (-1, -1), 'RIGHT'),
+    ]))
+    return [Paragraph('Order Summary', SECTION), table, Spacer(1, 3 * mm)]
+
+
+def matrix_table(po: Dict[str, Any], totals: Dict[str, Any]) -> List[Any]:
+    breakdown = po.get('size_colour_breakdown') or {}
+    sizes = breakdown.get('sizes') or []
+    values = breakdown.get('values') or {}
+    if not sizes or not totals['color_rows']:
+        return []
+    data = [['Colour'] + sizes + ['Quantity', 'Unit Price', 'Amount']]
+    for row in totals['color_rows']:
+        row_values = values.get(row['name']) or {}
+        data.append(
+            [text(row['name'])]
+            + [int(row_values.get(size) or 0) for size in sizes]
+            + [row['quantity'], format_inr(row['unit_price']), format_inr(row['amount'])]
+        )
+    data.append(
+        ['Total']
+        + [totals['size_totals'].get(size, 0) for size in sizes]
+        + [totals['total_quantity'], '-', format_inr(totals['subtotal'])]
+    )
+    fixed = CONTENT_WIDTH * 0.15 + CONTENT_WIDTH * 0.09 + CONTENT_WIDTH * 0.13 * 2
+    size_width = (CONTENT_WIDTH - fixed) / len(sizes)
+    widths = [CONTENT_WIDTH * 0.15] + [size_width] * len(sizes) + [CONTENT_WIDTH * 0.09, CONTENT_WIDTH * 0.13, CONTENT_WIDTH * 0.13]
+    table = Table(data, colWidths=widths, repeatRows=1)
+    table.setStyle(TableStyle(GRID_STYLE + [
+        ('BACKGROUND', (0, 0), (-1, 0), HEADER_BG),
+        ('BACKGROUND', (0, -1), (-1, -1), HEADER_BG),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+        ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+    ]))
+    summary = text(
+        f"Total Quantity: {totals['total_quantity']} pieces &nbsp;&nbsp; Total Amount: {format_inr(totals['subtotal'])}",
+        BODY_RIGHT
+    )
+    return [Paragraph('Item-wise Quantity &amp; Pricing Details', SECTION), table, Spacer(1, 2 * mm), summary, Spacer(1, 3 * mm)]
+
+
+def tax_summary(po: Dict[str, Any], totals: Dict[str, Any]) -> List[Any]:
+    tax_details = po.get('tax_details') or {}
+    if po.get('doc_type') != 'PI' or not tax_details:
+        return []
+    data = [['Subtotal:', format_inr(totals['subtotal'])]]
+    for component in ('gst', 'cgst', 'sgst', 'igst'):
+        percentage = tax_details.get(f"{component}_percentage") or 0
+        if percentage > 0:
+            data.append([f"{component.upper()} ({percentage}%):", format_inr(totals[f"{component}_amount"])])
+    data.append(['Net Total:', format_inr(totals['grand_total'])])
+    table = Table(data, colWidths=[CONTENT_WIDTH * 0.7, CONTENT_WIDTH * 0.3])
+    table.setStyle(TableStyle([
+        ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+        ('LINEABOVE', (0, -1), (-1, -1), 0.75, BORDER),
+    ]))
+    return [KeepTogether([table]), Spacer(1, 3 * mm)]
+
+
+def authorisation_block(po: Dict[str, Any]) -> Table:
+    auth = po.get('authorisation') or {}
+
+    def signatory(company: Optional[str], fallback: str, designation: Optional[str], name: Optional[str]) -> List[Any]:
+        block = [Paragraph(f"For {escape(company or fallback)}", SECTION)]
+        if designation:
+            block.append(text(designation))
+        block += [Spacer(1, 16 * mm), text(f"Name: {name}" if name else 'Authorised Signatory')]
+        return block
+
+    return boxed_pair(
+        signatory(auth.get('buyer_company'), 'Buyer', auth.get('buyer_designation'), auth.get('buyer_name')),
+        signatory(auth.get('supplier_company'), 'Supplier/Factory', auth.get('supplier_designation'), auth.get('supplier_name')),
+    )
+
+
+def render_po_pdf(po: Dict[str, Any], logo_bytes: Optional[bytes] = None) -> bytes:
+    """Render a stored PurchaseOrder document to PDF bytes"""
+    totals = compute_po_totals(po)
+    packing = po.get('packing_instructions') or {}
+    terms = po.get('other_terms') or {}
+
+    story = [
+        header(po, logo_bytes),
+        boxed_pair(party_block('Bill To (Invoice Party)', po.get('bill_to')), party_block('Buyer', po.get('buyer'))),
+        boxed_pair(party_block('Supplier / Factory (Ship From)', po.get('supplier')), [meta_block(po)]),
+    ]
+    story += order_summary(po, totals)
+    story += matrix_table(po, totals)
+    story += tax_summary(po, totals)
+    story += labelled_rows('Packing Instructions', [
+        ('Folding Instruction', packing.get('folding_instruction')),
+        ('Packing Instruction', packing.get('packing_instruction')),
+        ('Carton / Bag Markings', packing.get('carton_bag_markings')),
+    ])
+    story += labelled_rows('Other Terms', [
+        ('QC', terms.get('qc')),
+        ('Labels/Tags', terms.get('labels_tags')),
+        ('Shortage/Excess', terms.get('shortage_excess')),
+        ('Penalty', terms.get('penalty')),
+        ('Additional Notes', terms.get('notes')),
+    ])
+    story.append(KeepTogether([authorisation_block(po)]))
+
+    buffer = io.BytesIO()
+    document = SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        leftMargin=PAGE_MARGIN,
+        rightMargin=PAGE_MARGIN,
+        topMargin=PAGE_MARGIN,
+        bottomMargin=PAGE_MARGIN,
+        title=f"{po.get('doc_type', 'PO')} {po.get('po_number', '')}",
+    )
+    document.build(story)
+    return buffer.getvalue()
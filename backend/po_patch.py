@@ -0,0 +1,122 @@
+"""JSON-Patch-style sparse edits of a PO's matrix cells and order lines.
+
+Supported operations (RFC 6902 op names, JSON Pointer paths):
+
+    replace/add     /size_colour_breakdown/values/<colour>/<size>   cell count
+    remove          /size_colour_breakdown/values/<colour>/<size>
+    replace         /order_lines/<index>                            whole line
+    replace/add     /order_lines/<index>/<field>                    one field
+    add             /order_lines/-                                  append a line
+
+Each operation becomes a targeted $set/$unset on the matching dotted
+MongoDB path, so saving one changed cell writes one cell rather than the
+whole matrix. Anything else (new colours/sizes, removing lines) still goes
+through a full PUT.
+"""
+import copy
+from typing import Any, Callable, Dict, List, Set, Tuple
+
+from po_totals import color_name
+
+
+class PatchError(ValueError):
+    pass
+
+
+# Top-level fields a patch needs to read to apply ops and recompute totals
+PATCH_INPUT_FIELDS = ('size_colour_breakdown', 'order_lines', 'tax_details')
+
+
+def parse_pointer(path: str) -> List[str]:
+    """Split a JSON Pointer into unescaped segments"""
+    if not path.startswith('/'):
+        raise PatchError(f"Path must start with '/': {path}")
+    return [part.replace('~1', '/').replace('~0', '~') for part in path[1:].split('/')]
+
+
+def _field_segment(segment: str) -> str:
+    # Segments become parts of a dotted MongoDB path
+    if not segment or '.' in segment or segment.startswith('$'):
+        raise PatchError(f"Unsupported key in path: {segment!r}")
+    return segment
+
+
+def _cell_count(value: Any) -> int:
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value != int(value) or value < 0:
+        raise PatchError(f"Cell values must be non-negative whole numbers, got {value!r}")
+    return int(value)
+
+
+def apply_patch(
+    po: Dict[str, Any],
+    operations: List[Dict[str, Any]],
+    validate_line: Callable[[Dict[str, Any]], Dict[str, Any]]
+) -> Tuple[Dict[str, Any], Dict[str, Any], Set[str]]:
+    """Apply operations to a copy of po.
+
+    Returns (patched document, $set fields, $unset paths). validate_line
+    turns a raw order line into its stored form or raises ValueError.
+    """
+    po = copy.deepcopy(po)
+    breakdown = po.get('size_colour_breakdown') or {}
+    colours = {color_name(c) for c in breakdown.get('colors') or []}
+    sizes = set(breakdown.get('sizes') or [])
+    values = breakdown.setdefault('values', {})
+    lines = po.setdefault('order_lines', [])
+
+    set_fields: Dict[str, Any] = {}
+    unset_fields: Set[str] = set()
+
+    for operation in operations:
+        op = operation.get('op')
+        if op not in ('add', 'replace', 'remove'):
+            raise PatchError(f"Unsupported op: {op!r}")
+        parts = parse_pointer(operation.get('path', ''))
+
+        if parts[:2] == ['size_colour_breakdown', 'values'] and len(parts) == 4:
+            colour, size = _field_segment(parts[2]), _field_segment(parts[3])
+            if colour not in colours or size not in sizes:
+                raise PatchError(f"Unknown matrix cell {colour}/{size}; change colours and sizes with PUT")
+            path = f"size_colour_breakdown.values.{colour}.{size}"
+            if op == 'remove':
+                values.get(colour, {}).pop(size, None)
+                unset_fields.add(path)
+                set_fields.pop(path, None)
+            else:
+                count = _cell_count(operation.get('value'))
+                values.setdefault(colour, {})[size] = count
+                set_fields[path] = count
+                unset_fields.discard(path)
+            continue
+
+        if parts[0] == 'order_lines' and len(parts) in (2, 3):
+            if op == 'remove':
+                raise PatchError("Removing order lines is not supported; use PUT")
+            if parts[1] == '-':
+                if len(parts) != 2 or op != 'add':
+                    raise PatchError("Append order lines with add /order_lines/-")
+                index = len(lines)
+                lines.append(None)
+                line = operation.get('value')
+            else:
+                if not parts[1].isdigit() or int(parts[1]) >= len(lines):
+                    raise PatchError(f"No order line at index {parts[1]}")
+                index = int(parts[1])
+                if len(parts) == 2:
+                    line = operation.get('value')
+                else:
+                    line = dict(lines[index] or {})
+                    line[_field_segment(parts[2])] = operation.get('value')
+            if not isinstance(line, dict):
+                raise PatchError("Order lines must be objects")
+            try:
+                lines[index] = validate_line(line)
+            except ValueError as e:
+                raise PatchError(f"Invalid order line {index}: {str(e)}")
+            # Setting index == current length appends in MongoDB too
+            set_fields[f"order_lines.{index}"] = lines[index]
+            continue
+
+        raise PatchError(f"Unsupported path: {operation.get('path')}")
+
+    return po, set_fields, unset_fields
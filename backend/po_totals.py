@@ -0,0 +1,80 @@
+"""Server-side PO/PI totals.
+
+Mirrors the calculations PODocument.jsx performs on every render so that
+lists, reports and exports can read stored figures instead of crunching the
+size/colour matrix themselves.
+"""
+from typing import Any, Dict, List
+
+
+TAX_COMPONENTS = ('gst', 'cgst', 'sgst', 'igst')
+
+
+def color_name(color: Any) -> str:
+    """Colour name for both the old string format and ColorRow objects"""
+    if isinstance(color, dict):
+        return color.get('name', '')
+    return color
+
+
+def color_unit_price(color: Any) -> float:
+    """Per-colour unit price; old string colours carry no price"""
+    if isinstance(color, dict):
+        return float(color.get('unit_price') or color.get('unitPrice') or 0.0)
+    return 0.0
+
+
+def compute_color_rows(breakdown: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Quantity and amount for every colour row of the matrix"""
+    sizes = breakdown.get('sizes') or []
+    values = breakdown.get('values') or {}
+    rows = []
+    for color in breakdown.get('colors') or []:
+        name = color_name(color)
+        unit_price = color_unit_price(color)
+        row_values = values.get(name) or {}
+        quantity = sum(int(row_values.get(size) or 0) for size in sizes)
+        rows.append({
+            "name": name,
+            "quantity": quantity,
+            "unit_price": unit_price,
+            "amount": round(quantity * unit_price, 2),
+        })
+    return rows
+
+
+def compute_po_totals(po: Dict[str, Any]) -> Dict[str, Any]:
+    """Derive every stored total of a PO/PI document.
+
+    Quantities come from the size/colour matrix, amounts from the per-colour
+    unit prices, and tax components from tax_details as percentages of the
+    subtotal, exactly as rendered on the printed document.
+    """
+    breakdown = po.get('size_colour_breakdown') or {}
+    sizes = breakdown.get('sizes') or []
+    values = breakdown.get('values') or {}
+    color_rows = compute_color_rows(breakdown)
+
+    size_totals = {
+        size: sum(int((values.get(row['name']) or {}).get(size) or 0) for row in color_rows)
+        for size in sizes
+    }
+    subtotal = round(sum(row['amount'] for row in color_rows), 2)
+
+    tax_details = po.get('tax_details') or {}
+    taxes = {
+        f"{component}_amount": round(subtotal * float(tax_details.get(f"{component}_percentage") or 0.0) / 100, 2)
+        for component in TAX_COMPONENTS
+    }
+    total_tax = round(sum(taxes.values()), 2)
+
+    return {
+        "total_quantity": sum(row['quantity'] for row in color_rows),
+        "order_lines_quantity": sum(int(line.get('quantity') or 0) for line in po.get('order_lines') or []),
+        "size_totals": size_totals,
+        "color_rows": color_rows,
+        "subtotal": subtotal,
+        **taxes,
+        "total_tax": total_tax,
+        "grand_total": round(subtotal + total_tax, 2),
+    }
@@ -0,0 +1,107 @@
+"""MongoDB aggregation pipelines behind the /api/reports endpoints.
+
+All figures are read from the stored `totals` sub-document (see po_totals),
+so MongoDB returns only the grouped rows and no PO is shipped over the wire.
+"""
+from typing import Any, Dict, List, Optional
+
+
+TOTAL_ACCUMULATORS = {
+    "po_count": {"$sum": 1},
+    "quantity": {"$sum": {"$ifNull": ["$totals.total_quantity", 0]}},
+    "spend": {"$sum": {"$ifNull": ["$totals.subtotal", 0]}},
+    "tax": {"$sum": {"$ifNull": ["$totals.total_tax", 0]}},
+    "grand_total": {"$sum": {"$ifNull": ["$totals.grand_total", 0]}},
+}
+
+
+def match_stage(
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    doc_type: Optional[str] = None
+) -> Dict[str, Any]:
+    """$match on the ISO (YYYY-MM-DD) po_date range, inclusive, and doc_type"""
+    match = {}
+    if date_from or date_to:
+        match["po_date"] = {}
+        if date_from:
+            match["po_date"]["$gte"] = date_from
+        if date_to:
+            match["po_date"]["$lte"] = date_to
+    if doc_type:
+        match["doc_type"] = doc_type
+    return {"$match": match}
+
+
+def grouped_pipeline(match: Dict[str, Any], key_name: str, key_expr: Any, sort: Dict[str, int]) -> List[Dict[str, Any]]:
+    """Group POs by key_expr and project the totals under key_name"""
+    return [
+        match,
+        {"$group": {"_id": key_expr, **TOTAL_ACCUMULATORS}},
+        {"$project": {
+            "_id": 0,
+            key_name: "$_id",
+            **{field: 1 for field in TOTAL_ACCUMULATORS},
+        }},
+        {"$sort": sort},
+    ]
+
+
+def spend_by_supplier_pipeline(match: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return grouped_pipeline(match, "supplier", "$supplier.company", {"spend": -1, "supplier": 1})
+
+
+def spend_by_month_pipeline(match: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # po_date is stored as YYYY-MM-DD, so the month is its first 7 characters
+    return grouped_pipeline(match, "month", {"$substrCP": ["$po_date", 0, 7]}, {"month": 1})
+
+
+def spend_by_doc_type_pipeline(match: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return grouped_pipeline(match, "doc_type", {"$ifNull": ["$doc_type", "PO"]}, {"doc_type": 1})
+
+
+def spend_by_style_pipeline(match: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Quantity and spend per OrderLine.style_code.
+
+    Order line prices are not reliable per line (the editor folds the matrix
+    amount into the first line), so a PO's subtotal is shared across its
+    lines in proportion to each line's quantity.
+    """
+    return [
+        match,
+        {"$unwind": "$order_lines"},
+        {"$group": {
+            "_id": "$order_lines.style_code",
+            "po_ids": {"$addToSet": "$id"},
+            "line_count": {"$sum": 1},
+            "quantity": {"$sum": {"$ifNull": ["$order_lines.quantity", 0]}},
+            "spend": {"$sum": {"$cond": [
+                {"$gt": [{"$ifNull": ["$totals.order_lines_quantity", 0]}, 0]},
+                {"$multiply": [
+                    {"$ifNull": ["$totals.subtotal", 0]},
+                    {"$divide": [
+                        {"$ifNull": ["$order_lines.quantity", 0]},
+                        "$totals.order_lines_quantity"
+                    ]}
+                ]},
+                0
+            ]}},
+        }},
+        {"$project": {
+            "_id": 0,
+            "style_code": "$_id",
+            "po_count": {"$size": "$po_ids"},
+            "line_count": 1,
+            "quantity": 1,
+            "spend": {"$round": ["$spend", 2]},
+        }},
+        {"$sort": {"spend": -1, "style_code": 1}},
+    ]
+
+
+REPORT_PIPELINES = {
+    "spend-by-supplier": spend_by_supplier_pipeline,
+    "spend-by-month": spend_by_month_pipeline,
+    "spend-by-doc-type": spend_by_doc_type_pipeline,
+    "spend-by-style": spend_by_style_pipeline,
+}
@@ -1,17 +1,46 @@
-from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Form, Request
+from fastapi.encoders import jsonable_encoder
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse, ORJSONResponse, Response, StreamingResponse
 from dotenv import load_dotenv
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException as StarletteHTTPException
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
+from gridfs.errors import NoFile
+from pymongo import ASCENDING, DESCENDING, TEXT, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
 import os
+import asyncio
 import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict, field_validator
-from typing import List, Optional, Dict, Any, Union
+from pydantic import BaseModel, Field, ConfigDict, AliasChoices, field_serializer, field_validator
+from typing import List, Optional, Dict, Any, Union, AsyncIterator
 import uuid
 from datetime import datetime, timezone
 import base64
+import copy
+import hashlib
+import time
+import json
+import orjson
 import re
+import unicodedata
+from contextlib import asynccontextmanager, contextmanager
+
+from po_totals import compute_po_totals
+from reports import REPORT_PIPELINES, match_stage
+from exports import CSV_LAYOUTS, EXPORT_PROJECTION, csv_chunk, ndjson_line
+from pdf_render import RENDER_VERSION, render_po_pdf
+from pdf_cache import PDFCache
+from logo_images import process_logo
+from po_patch import PATCH_INPUT_FIELDS, PatchError, apply_patch
+from numbering import NumberAllocator, format_number, normalize_prefix, number_date
+from mongo_pool_metrics import PoolMetrics
 
 
 ROOT_DIR = Path(__file__).parent
@@ -19,21 +48,166 @@ load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ.get('MONGO_URL') or os.environ.get('MONGO_URI', 'mongodb://localhost:27017')
-client = AsyncIOMotorClient(mongo_url)
+MONGO_POOL_OPTIONS = {
+    "maxPoolSize": int(os.environ.get('MONGO_MAX_POOL_SIZE', '100')),
+    "minPoolSize": int(os.environ.get('MONGO_MIN_POOL_SIZE', '0')),
+    # Fail a request after 5s without a reachable server instead of PyMongo's 30s
+    "serverSelectionTimeoutMS": int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000')),
+}
+# Unset means PyMongo's default: idle connections are kept, checkouts wait indefinitely
+for option, env_name in (("maxIdleTimeMS", 'MONGO_MAX_IDLE_TIME_MS'), ("waitQueueTimeoutMS", 'MONGO_WAIT_QUEUE_TIMEOUT_MS')):
+    if os.environ.get(env_name):
+        MONGO_POOL_OPTIONS[option] = int(os.environ[env_name])
+
+# The client connects lazily, so creating it here does no I/O; lifespan
+# warms the pool before serving and closes it on shutdown
+pool_metrics = PoolMetrics()
+client = AsyncIOMotorClient(mongo_url, event_listeners=[pool_metrics], **MONGO_POOL_OPTIONS)
 db = client[os.environ.get('DB_NAME', 'po_generator')]
 
+# Logo bytes live in GridFS; settings only holds metadata
+logo_bucket = AsyncIOMotorGridFSBucket(db, bucket_name="logos")
+
 # Upload directory setup
 upload_dir = os.environ.get('UPLOAD_DIR', str(ROOT_DIR / 'uploads'))
 Path(upload_dir).mkdir(parents=True, exist_ok=True)
 
+# Content-addressed logo files, a local copy of GridFS served under /uploads/logos
+logo_dir = Path(upload_dir) / 'logos'
+logo_dir.mkdir(parents=True, exist_ok=True)
+LOGO_EXTENSIONS = {'image/png': '.png', 'image/jpeg': '.jpg', 'image/jpg': '.jpg', 'image/webp': '.webp'}
+LOGO_NAME_PATTERN = re.compile(r'^logos/([0-9a-f]{32})\.(png|jpg|webp)$')
+LOGO_MAX_BYTES = 5 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# Allowance for multipart boundaries/headers when pre-checking Content-Length
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+# Files younger than this are never treated as orphans (upload may be in flight)
+ORPHAN_GRACE_SECONDS = 3600
+
+# PDF rendering runs in worker processes so it never blocks the event loop
+PDF_WORKERS = int(os.environ.get('PDF_WORKERS', '2'))
+pdf_executor: Optional[ProcessPoolExecutor] = None
+
+# Settings document cache: TTL plus change-stream (or polling) refresh
+SETTINGS_CACHE_TTL = float(os.environ.get('SETTINGS_CACHE_TTL', '30'))
+SETTINGS_POLL_INTERVAL = float(os.environ.get('SETTINGS_POLL_INTERVAL', '5'))
+
+# Typeahead keys are internal; directory responses leave them out
+DIRECTORY_PUBLIC_PROJECTION = {"name_key": 0, "gstin_key": 0}
+
+# Buyer/supplier/bill-to lists are cached per worker and revalidated against
+# a shared version on every read; the TTL only bounds how long a write made
+# outside the API (e.g. by hand in the shell) can go unnoticed
+DIRECTORY_CACHE_TTL = float(os.environ.get('DIRECTORY_CACHE_TTL', '30'))
+
+# Rendered PDFs are cached on disk, keyed by PO content + logo
+pdf_cache = PDFCache(
+    os.environ.get('PDF_CACHE_DIR', str(ROOT_DIR / 'pdf_cache')),
+    int(os.environ.get('PDF_CACHE_MAX_MB', '256')) * 1024 * 1024
+)
+
+# PO/PI numbers come from per-day counters; each worker leases a block at a time
+NUMBER_BLOCK_SIZE = int(os.environ.get('NUMBER_BLOCK_SIZE', '10'))
+number_allocator = NumberAllocator(db.counters, NUMBER_BLOCK_SIZE)
+# Upper bound for one /next-numbers reservation
+NUMBER_BATCH_MAX = 500
+
+# Bump when run_bootstrap gains a step existing deployments must run;
+# workers report not-ready until `python migrate.py bootstrap` catches up
+BOOTSTRAP_VERSION = 1
+BOOTSTRAP_STATE_ID = "bootstrap"
+BOOTSTRAP_LOCK_LEASE = float(os.environ.get('BOOTSTRAP_LOCK_LEASE', '60'))
+# Readiness gives up on an unreachable database after this long
+READINESS_TIMEOUT = float(os.environ.get('READINESS_TIMEOUT', '2'))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await startup_event()
+    yield
+    await shutdown_db_client()
+
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
+
+
+class UploadStaticFiles(StaticFiles):
+    """Static /uploads with immutable caching for content-addressed logos.
+
+    Logo URLs embed the content hash, so they can be cached forever and a
+    new upload simply gets a new URL. A logo missing on local disk (e.g. a
+    fresh container) is restored from GridFS on first request.
+    """
+    async def get_response(self, path: str, scope) -> Response:
+        try:
+            return await super().get_response(path, scope)
+        except StarletteHTTPException as exc:
+            match = LOGO_NAME_PATTERN.match(path.replace(os.sep, '/'))
+            if exc.status_code != 404 or not match or not await restore_logo_file(Path(path).name):
+                raise
+            return await super().get_response(path, scope)
+    
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200) -> Response:
+        relative = os.path.relpath(full_path, upload_dir).replace(os.sep, '/')
+        match = LOGO_NAME_PATTERN.match(relative)
+        if not match:
+            return super().file_response(full_path, stat_result, scope, status_code)
+        
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        response.headers['etag'] = f'"{match.group(1)}"'
+        response.headers['cache-control'] = 'public, max-age=31536000, immutable'
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
 # Mount uploads directory for static file serving
-app.mount("/uploads", StaticFiles(directory=upload_dir), name="uploads")
+app.mount("/uploads", UploadStaticFiles(directory=upload_dir), name="uploads")
+
+
+LOGO_TOO_LARGE_DETAIL = "File size must be less than 5MB"
+
+
+class LogoUploadLimitMiddleware:
+    """Cap the request body of logo uploads before Starlette spools it.
+
+    A Content-Length over the cap is rejected without reading the body;
+    otherwise (e.g. chunked uploads) bytes are counted as they arrive and
+    the request fails with 413 as soon as the cap is passed.
+    """
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] != 'POST' or scope['path'] != '/api/settings/logo':
+            await self.app(scope, receive, send)
+            return
+        
+        limit = LOGO_MAX_BYTES + MULTIPART_OVERHEAD_BYTES
+        content_length = Headers(scope=scope).get('content-length')
+        if content_length and content_length.isdigit() and int(content_length) > limit:
+            await JSONResponse(status_code=413, content={"detail": LOGO_TOO_LARGE_DETAIL})(scope, receive, send)
+            return
+        
+        received = 0
+        
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message['type'] == 'http.request':
+                received += len(message.get('body', b''))
+                if received > limit:
+                    # Re-raised by FastAPI's body parsing and rendered as a 413
+                    raise HTTPException(status_code=413, detail=LOGO_TOO_LARGE_DETAIL)
+            return message
+        
+        await self.app(scope, limited_receive, send)
+
+
+app.add_middleware(LogoUploadLimitMiddleware)
 
 
 # PO Models
@@ -66,7 +240,8 @@ class OrderLine(BaseModel):
 class ColorRow(BaseModel):
     """Represents a single color row with quantities and pricing"""
     name: str
-    unit_price: Optional[float] = 0.0
+    # The editor sends camelCase unitPrice; accept both spellings
+    unit_price: Optional[float] = Field(default=0.0, validation_alias=AliasChoices('unit_price', 'unitPrice'))
     
 class SizeColourBreakdown(BaseModel):
     sizes: List[str]
@@ -163,16 +338,37 @@ class TaxDetails(BaseModel):
     sgst_percentage: float = 0.0
     igst_percentage: float = 0.0
 
+class ColorRowTotal(BaseModel):
+    name: str
+    quantity: int
+    unit_price: float
+    amount: float
+
+class POTotals(BaseModel):
+    """Server-computed totals, see po_totals.compute_po_totals"""
+    total_quantity: int = 0
+    order_lines_quantity: int = 0
+    size_totals: Dict[str, int] = Field(default_factory=dict)
+    color_rows: List[ColorRowTotal] = Field(default_factory=list)
+    subtotal: float = 0.0
+    gst_amount: float = 0.0
+    cgst_amount: float = 0.0
+    sgst_amount: float = 0.0
+    igst_amount: float = 0.0
+    total_tax: float = 0.0
+    grand_total: float = 0.0
+
 class AppSettings(BaseModel):
-    logo_base64: Optional[str] = None
     logo_filename: Optional[str] = None
-    # PO/PI auto-increment settings
-    next_po_number: int = 1
+    logo_url: Optional[str] = None
+    logo_sha256: Optional[str] = None
+    # PO/PI numbering settings; the sequences themselves live in `counters`
     po_prefix: str = "NA/"
     use_po_prefix: bool = False
-    next_pi_number: int = 1
     pi_prefix: str = "PI/"
     use_pi_prefix: bool = False
+    # Assign the number when a new document is first saved, not when the editor opens
+    lazy_numbering: bool = False
     # Pricing settings
     default_unit_price: Optional[float] = 0.0
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -202,8 +398,16 @@ class PurchaseOrder(BaseModel):
     authorisation: Authorisation
     tax_details: Optional[TaxDetails] = Field(default_factory=lambda: TaxDetails())
     logo_url: Optional[str] = None
+    totals: Optional[POTotals] = None
+    # Bumped on every update; clients send it back to detect conflicting saves
+    revision: int = 0
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    
+    @field_serializer('created_at', 'updated_at')
+    def serialize_timestamp(self, value: datetime) -> str:
+        # Stored and legacy-converted documents must read back alike: UTC, "+00:00"
+        return utc_timestamp(value).isoformat()
 
 class POCreate(BaseModel):
     doc_type: str = "PO"
@@ -242,6 +446,115 @@ class POUpdate(BaseModel):
     authorisation: Optional[Authorisation] = None
     tax_details: Optional[TaxDetails] = None
     logo_url: Optional[str] = None
+    # Revision the client last saw; omit to skip the conflict check
+    revision: Optional[int] = None
+
+class POPatch(BaseModel):
+    """Sparse edit of matrix cells and order lines, see po_patch"""
+    revision: Optional[int] = None
+    operations: List[Dict[str, Any]]
+
+class POSummary(BaseModel):
+    """Lightweight PO row for list views - no order lines, matrix or terms"""
+    id: str
+    doc_type: str = "PO"
+    po_number: str
+    po_date: str
+    delivery_date: Optional[str] = None
+    supplier_company: Optional[str] = None
+    grand_total: int = 0
+    amount: float = 0.0
+    created_at: str
+
+class POSummaryPage(BaseModel):
+    items: List[POSummary]
+    next_cursor: Optional[str] = None
+    limit: int
+
+
+# Fields fetched for list views; everything else stays in MongoDB
+PO_SUMMARY_PROJECTION = {
+    "_id": 0,
+    "id": 1,
+    "doc_type": 1,
+    "po_number": 1,
+    "po_date": 1,
+    "delivery_date": 1,
+    "supplier.company": 1,
+    "size_colour_breakdown.grand_total": 1,
+    "totals.total_quantity": 1,
+    "totals.subtotal": 1,
+    "created_at": 1,
+}
+
+# Documents at this version are stored exactly as PurchaseOrder dumps them
+# (canonical colours, lists, ISO timestamps) and are served without
+# re-validation; see po_response_data
+PO_SCHEMA_VERSION = 1
+# Stored-only fields that never appear in full-PO responses
+PO_READ_PROJECTION = {"_id": 0, "search_keys": 0}
+
+PO_PAGE_DEFAULT_LIMIT = 50
+PO_PAGE_MAX_LIMIT = 200
+
+# Search keys are "<namespace>:<prefix>" strings: n = po_number, s = supplier.company
+SEARCH_PREFIX_MAX = 20
+SEARCH_CANDIDATE_LIMIT = 200
+SEARCH_DEFAULT_LIMIT = 20
+
+# Directory typeahead
+DIRECTORY_COLLECTIONS = ("buyers", "suppliers", "billto")
+DIRECTORY_KEY_FIELDS = ("name_key", "gstin_key")
+SUGGEST_DEFAULT_LIMIT = 10
+SUGGEST_MAX_LIMIT = 50
+SUGGEST_PROJECTION = {"_id": 0, "id": 1, "company_name": 1, "gstin": 1}
+
+EXPORT_BATCH_SIZE = 500
+
+IMPORT_CHUNK_SIZE = 500
+UTF8_BOM = b'\xef\xbb\xbf'
+# Fields an import may carry over from the legacy system instead of generating
+IMPORT_PRESERVED_FIELDS = ('id', 'created_at', 'updated_at')
+# Stored as UTC ISO strings, which listing cursors and filters compare as text
+PO_TIMESTAMP_FIELDS = ('created_at', 'updated_at')
+
+# Indexes created at startup: {collection: [(keys, options), ...]}
+INDEX_SPECS = {
+    "purchase_orders": [
+        ([("id", ASCENDING)], {"name": "id_unique", "unique": True}),
+        ([("po_number", ASCENDING)], {"name": "po_number_unique", "unique": True}),
+        ([("doc_type", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], {"name": "doc_type_created_at"}),
+        ([("created_at", DESCENDING), ("id", DESCENDING)], {"name": "created_at_id"}),
+        ([("search_keys", ASCENDING), ("created_at", DESCENDING)], {"name": "search_keys_created_at"}),
+        ([("po_date", ASCENDING), ("doc_type", ASCENDING)], {"name": "po_date_doc_type"}),
+        ([("po_number", TEXT), ("supplier.company", TEXT)], {
+            "name": "po_text",
+            "weights": {"po_number": 10, "supplier.company": 5},
+            "default_language": "none",
+        }),
+    ],
+    "buyers": [
+        ([("id", ASCENDING)], {"name": "id_unique", "unique": True}),
+        ([("name_key", ASCENDING)], {"name": "name_key"}),
+        ([("gstin_key", ASCENDING)], {"name": "gstin_key"}),
+    ],
+    "suppliers": [
+        ([("id", ASCENDING)], {"name": "id_unique", "unique": True}),
+        ([("name_key", ASCENDING)], {"name": "name_key"}),
+        ([("gstin_key", ASCENDING)], {"name": "gstin_key"}),
+    ],
+    "billto": [
+        ([("id", ASCENDING)], {"name": "id_unique", "unique": True}),
+        ([("name_key", ASCENDING)], {"name": "name_key"}),
+        ([("gstin_key", ASCENDING)], {"name": "gstin_key"}),
+    ],
+    "counters": [
+        ([("doc_type", ASCENDING), ("prefix", ASCENDING), ("date", ASCENDING)], {
+            "name": "doc_type_prefix_date_unique",
+            "unique": True,
+        }),
+    ],
+}
 
 
 def sanitize_filename(filename: str) -> str:
@@ -256,43 +569,921 @@ def sanitize_filename(filename: str) -> str:
     return f"{name}_{timestamp}{ext}"
 
 
+async def ensure_indexes() -> Dict[str, Dict[str, str]]:
+    """Create every index in INDEX_SPECS and verify it exists afterwards.
+
+    Failures (e.g. duplicate po_numbers blocking a unique index) are logged
+    per index instead of aborting startup, so the API still comes up.
+    """
+    status = {}
+    for collection_name, specs in INDEX_SPECS.items():
+        collection = db[collection_name]
+        status[collection_name] = {}
+        for keys, options in specs:
+            name = options["name"]
+            try:
+                await collection.create_index(keys, **options)
+                status[collection_name][name] = "ok"
+            except OperationFailure as e:
+                status[collection_name][name] = f"failed: {str(e)}"
+        
+        existing = await collection.index_information()
+        for name, state in status[collection_name].items():
+            if state == "ok" and name not in existing:
+                status[collection_name][name] = "missing after build"
+    
+    for collection_name, indexes in status.items():
+        for name, state in indexes.items():
+            if state == "ok":
+                logging.info(f"✅ Index {collection_name}.{name} ready")
+            else:
+                logging.error(f"❌ Index {collection_name}.{name} {state}")
+    return status
+
+
+def search_tokens(text: Optional[str]) -> List[str]:
+    """Lowercase, accent-stripped alphanumeric tokens of a string"""
+    if not text:
+        return []
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+    return [t for t in re.split(r'[\W_]+', text) if t]
+
+
+def build_search_keys(po_number: Optional[str], supplier_company: Optional[str]) -> List[str]:
+    """Every token prefix of po_number and supplier.company, namespaced by field"""
+    keys = set()
+    for namespace, text in (("n", po_number), ("s", supplier_company)):
+        for token in search_tokens(text):
+            for i in range(1, min(len(token), SEARCH_PREFIX_MAX) + 1):
+                keys.add(f"{namespace}:{token[:i]}")
+    return sorted(keys)
+
+
+def with_search_keys(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Set doc['search_keys'] from its po_number and supplier company"""
+    doc['search_keys'] = build_search_keys(
+        doc.get('po_number'),
+        (doc.get('supplier') or {}).get('company')
+    )
+    return doc
+
+
+def directory_name_key(company_name: Optional[str]) -> str:
+    """Normalized company name for anchored prefix matching"""
+    return ' '.join(search_tokens(company_name))
+
+
+def directory_gstin_key(gstin: Optional[str]) -> str:
+    """GSTIN uppercased with spaces and punctuation removed"""
+    return re.sub(r'[^0-9A-Z]', '', (gstin or '').upper())
+
+
+def with_directory_keys(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Set the typeahead keys on a buyer/supplier/bill-to document"""
+    doc['name_key'] = directory_name_key(doc.get('company_name'))
+    doc['gstin_key'] = directory_gstin_key(doc.get('gstin'))
+    return doc
+
+
+ISO_DATE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+
+def validate_date_range(date_from: Optional[str], date_to: Optional[str]) -> None:
+    """po_date filters are compared as text, so only real YYYY-MM-DD dates are accepted"""
+    for value in (date_from, date_to):
+        if not value:
+            continue
+        try:
+            if not ISO_DATE_PATTERN.match(value):
+                raise ValueError(value)
+            datetime.strptime(value, '%Y-%m-%d')
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Dates must be in YYYY-MM-DD format")
+
+
+def build_po_query(search: Optional[str] = None, supplier: Optional[str] = None) -> Dict[str, Any]:
+    """Build the MongoDB filter shared by the PO list endpoints.
+
+    Each search token must prefix-match a token of the PO number or supplier;
+    each supplier token must prefix-match a supplier token. Both resolve to
+    equality lookups on the indexed `search_keys` array.
+    """
+    clauses = []
+    
+    for token in search_tokens(search):
+        token = token[:SEARCH_PREFIX_MAX]
+        clauses.append({"search_keys": {"$in": [f"n:{token}", f"s:{token}"]}})
+    
+    for token in search_tokens(supplier):
+        clauses.append({"search_keys": f"s:{token[:SEARCH_PREFIX_MAX]}"})
+    
+    if not clauses:
+        return {}
+    if len(clauses) == 1:
+        return clauses[0]
+    return {"$and": clauses}
+
+
+def rank_search_match(po: Dict[str, Any], tokens: List[str]) -> int:
+    """Score a prefix-search hit: exact number > whole-token match > prefix match"""
+    number_tokens = search_tokens(po.get('po_number'))
+    supplier_tokens = search_tokens((po.get('supplier') or {}).get('company'))
+    score = 0
+    if tokens and tokens == number_tokens:
+        score += 100
+    for token in tokens:
+        if token in number_tokens:
+            score += 4
+        elif token in supplier_tokens:
+            score += 3
+        elif any(t.startswith(token) for t in number_tokens):
+            score += 2
+        else:
+            score += 1
+    return score
+
+
+# (doc_type, old settings counter field, prefix field, default prefix)
+LEGACY_COUNTER_FIELDS = (
+    ("PO", "next_po_number", "po_prefix", "NA/"),
+    ("PI", "next_pi_number", "pi_prefix", "PI/"),
+)
+
+async def migrate_legacy_counters() -> bool:
+    """Move PO/PI sequences out of the settings document into `counters`.
+
+    Numbers used to come from one global sequence per doc_type in settings.
+    Today's (doc_type, prefix, date) counter is seeded past it so no number
+    already issued today is handed out again, then the old fields are
+    dropped.
+    """
+    settings = await db.settings.find_one({"_id": "app_settings"}) or {}
+    migrated = False
+    date_str = number_date()
+    
+    for doc_type, counter_field, prefix_field, default_prefix in LEGACY_COUNTER_FIELDS:
+        if settings.get(counter_field):
+            prefix = normalize_prefix(settings.get(prefix_field) or default_prefix)
+            await number_allocator.seed(doc_type, prefix, date_str, settings[counter_field])
+    
+    if any(field in settings for _, field, _, _ in LEGACY_COUNTER_FIELDS):
+        await db.settings.update_one(
+            {"_id": "app_settings"},
+            {"$unset": {field: "" for _, field, _, _ in LEGACY_COUNTER_FIELDS}}
+        )
+        settings_cache.invalidate()
+        migrated = True
+    return migrated
+
+
+async def _backfill(collection, query: Dict[str, Any], projection: Dict[str, Any], build_update, batch_size: int) -> int:
+    """$set build_update(doc) on every document matching query, in unordered bulk batches"""
+    updated = 0
+    batch = []
+    async for doc in collection.find(query, projection):
+        batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": build_update(doc)}))
+        if len(batch) >= batch_size:
+            await collection.bulk_write(batch, ordered=False)
+            updated += len(batch)
+            batch = []
+    if batch:
+        await collection.bulk_write(batch, ordered=False)
+        updated += len(batch)
+    return updated
+
+
+async def backfill_po_totals(batch_size: int = 200) -> int:
+    """Compute and store totals on POs saved before totals were persisted"""
+    return await _backfill(
+        db.purchase_orders,
+        {"totals": {"$exists": False}},
+        {"_id": 1, "order_lines": 1, "size_colour_breakdown": 1, "tax_details": 1},
+        lambda po: {"totals": compute_po_totals(po)},
+        batch_size
+    )
+
+
+async def backfill_search_keys(batch_size: int = 500) -> int:
+    """Populate search_keys on POs written before prefix search existed"""
+    return await _backfill(
+        db.purchase_orders,
+        {"search_keys": {"$exists": False}},
+        {"_id": 1, "po_number": 1, "supplier.company": 1},
+        lambda po: {"search_keys": build_search_keys(po.get('po_number'), (po.get('supplier') or {}).get('company'))},
+        batch_size
+    )
+
+
+def _directory_keys_update(doc: Dict[str, Any]) -> Dict[str, Any]:
+    with_directory_keys(doc)
+    return {field: doc[field] for field in DIRECTORY_KEY_FIELDS}
+
+
+async def backfill_directory_keys(batch_size: int = 500) -> int:
+    """Populate name_key/gstin_key on directory entries written before typeahead existed"""
+    updated = 0
+    for collection_name in DIRECTORY_COLLECTIONS:
+        updated += await _backfill(
+            db[collection_name],
+            {"name_key": {"$exists": False}},
+            {"_id": 1, "company_name": 1, "gstin": 1},
+            _directory_keys_update,
+            batch_size
+        )
+    return updated
+
+
+def fill_order_line_defaults(order_lines: List[Dict[str, Any]], breakdown: Dict[str, Any]) -> None:
+    """Derive missing order line colors/size_range from the size/colour breakdown"""
+    breakdown_colors = breakdown.get('colors', [])
+    breakdown_sizes = breakdown.get('sizes', [])
+    
+    # Extract color names if colors are objects
+    color_names = []
+    if breakdown_colors:
+        for c in breakdown_colors:
+            if isinstance(c, dict):
+                color_names.append(c.get('name', ''))
+            else:
+                color_names.append(c)
+    
+    for line in order_lines:
+        if not line.get('colors'):
+            line['colors'] = color_names
+        if not line.get('size_range'):
+            line['size_range'] = breakdown_sizes
+
+
+def po_response_data(po: Dict[str, Any]) -> Dict[str, Any]:
+    """API form of a stored PO (read with PO_READ_PROJECTION).
+
+    Documents written at PO_SCHEMA_VERSION are already a dumped
+    PurchaseOrder and pass straight through; older ones are validated and
+    converted once per read.
+    """
+    if po.pop('schema_version', None) == PO_SCHEMA_VERSION:
+        return po
+    return PurchaseOrder(**po).model_dump(mode='json')
+
+
+def utc_timestamp(value: Union[str, datetime]) -> datetime:
+    """Parse an ISO timestamp and convert it to UTC; naive values are taken as UTC"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if not isinstance(value, datetime):
+        raise ValueError(f"Expected an ISO timestamp, got {value!r}")
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def build_po_document(po_dict: Dict[str, Any]) -> tuple:
+    """Turn a dumped POCreate into (PurchaseOrder, MongoDB document).
+
+    po_dict may also carry id/created_at/updated_at (e.g. from an import),
+    which PurchaseOrder validates instead of generating fresh values.
+    """
+    # If colors/size_range not provided in order_lines, derive from breakdown
+    fill_order_line_defaults(po_dict.get('order_lines', []), po_dict.get('size_colour_breakdown', {}))
+    
+    po_dict['totals'] = compute_po_totals(po_dict)
+    po_obj = PurchaseOrder(**po_dict)
+    doc = po_obj.model_dump()
+    doc['schema_version'] = PO_SCHEMA_VERSION
+    with_search_keys(doc)
+    return po_obj, doc
+
+
+def get_pdf_executor() -> ProcessPoolExecutor:
+    """Lazily start the PDF worker pool (spawned, so workers don't inherit Motor's threads)"""
+    global pdf_executor
+    if pdf_executor is None:
+        pdf_executor = ProcessPoolExecutor(
+            max_workers=PDF_WORKERS,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+    return pdf_executor
+
+
+class SettingsCache:
+    """In-process copy of the `app_settings` document.
+
+    Reads are served from memory. Entries expire after SETTINGS_CACHE_TTL,
+    writers in this process call invalidate() or set(), and a background
+    task picks up writes from other workers: a MongoDB change stream when
+    the server is a replica set, otherwise a reload every
+    SETTINGS_POLL_INTERVAL seconds.
+    """
+    def __init__(self, doc_id: str, ttl: float, poll_interval: float):
+        self.doc_id = doc_id
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self.mode = "ttl"
+        self._doc: Optional[Dict[str, Any]] = None
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+    
+    def _is_fresh(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl
+    
+    async def _load(self) -> None:
+        self.set(await db.settings.find_one({"_id": self.doc_id}))
+    
+    async def get(self) -> Optional[Dict[str, Any]]:
+        """A private copy of the settings document, or None if it doesn't exist"""
+        if not self._is_fresh():
+            async with self._lock:
+                if not self._is_fresh():
+                    await self._load()
+        return copy.deepcopy(self._doc)
+    
+    def set(self, doc: Optional[Dict[str, Any]]) -> None:
+        """Replace the cached document, e.g. with a find_one_and_update result"""
+        self._doc = doc
+        self._loaded_at = time.monotonic()
+    
+    def invalidate(self) -> None:
+        self._loaded_at = None
+    
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._watch())
+    
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def _watch(self) -> None:
+        try:
+            pipeline = [{"$match": {"documentKey._id": self.doc_id}}]
+            async with db.settings.watch(pipeline) as stream:
+                self.mode = "change_stream"
+                logging.info("Settings cache following change stream")
+                async for _ in stream:
+                    self.invalidate()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Standalone servers (no replica set) don't support change streams
+            logging.info(f"Settings change stream unavailable ({str(e)}); polling every {self.poll_interval}s")
+        
+        self.mode = "polling"
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self._load()
+            except Exception as e:
+                logging.warning(f"Settings cache refresh failed: {str(e)}")
+
+
+settings_cache = SettingsCache("app_settings", SETTINGS_CACHE_TTL, SETTINGS_POLL_INTERVAL)
+
+
+class DirectoryCache:
+    """Serialized JSON listing of one directory collection plus its weak ETag.
+
+    Every API write bumps a version counter stored in the
+    `directory_versions` collection. Reads fetch that counter (one _id
+    lookup) and reload when it differs from the version the cached body
+    was built from, so a write through any worker is seen by all of them
+    on their next request. The ETag hashes the body, so it is the same on
+    every worker that holds the same data.
+    """
+    def __init__(self, collection_name: str, ttl: float):
+        self.collection_name = collection_name
+        self.ttl = ttl
+        self._body: Optional[bytes] = None
+        self._etag: Optional[str] = None
+        self._loaded_version: Optional[int] = None
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+    
+    async def stored_version(self) -> int:
+        doc = await db.directory_versions.find_one({"_id": self.collection_name})
+        return (doc or {}).get('version', 0)
+    
+    def _is_fresh(self, version: int) -> bool:
+        return (
+            self._body is not None
+            and self._loaded_version == version
+            and time.monotonic() - self._loaded_at < self.ttl
+        )
+    
+    async def get(self) -> tuple:
+        """(body, etag) for the current listing, loading it if needed"""
+        version = await self.stored_version()
+        if not self._is_fresh(version):
+            async with self._lock:
+                if not self._is_fresh(version):
+                    docs = await db[self.collection_name].find({}, DIRECTORY_PUBLIC_PROJECTION).to_list(length=None)
+                    for doc in docs:
+                        doc['_id'] = str(doc['_id'])
+                    body = json.dumps(jsonable_encoder(docs), ensure_ascii=False).encode('utf-8')
+                    # Tagged with the version read before loading: a write that
+                    # races the load bumps it again and forces the next reload
+                    self._body = body
+                    self._etag = f'W/"{hashlib.sha256(body).hexdigest()[:32]}"'
+                    self._loaded_version = version
+                    self._loaded_at = time.monotonic()
+                return self._body, self._etag
+        return self._body, self._etag
+    
+    async def invalidate(self) -> None:
+        """Call after every write to the collection"""
+        self._loaded_version = None
+        await db.directory_versions.update_one(
+            {"_id": self.collection_name},
+            {"$inc": {"version": 1}},
+            upsert=True
+        )
+
+
+directory_caches = {
+    name: DirectoryCache(name, DIRECTORY_CACHE_TTL)
+    for name in DIRECTORY_COLLECTIONS
+}
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Weak If-None-Match comparison against a single ETag"""
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    bare = etag[2:] if etag.startswith('W/') else etag
+    for candidate in header.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == bare:
+            return True
+    return False
+
+
+async def directory_response(request: Request, collection_name: str) -> Response:
+    """Cached directory listing, or 304 when the client's copy is current"""
+    body, etag = await directory_caches[collection_name].get()
+    # no-cache: browsers may keep the body but must revalidate every time
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+LOGO_SETTINGS_FIELDS = (
+    'logo_path', 'logo_base64', 'logo_url', 'logo_filename', 'logo_file_id', 'logo_variants'
+)
+
+
+async def get_logo_settings() -> Dict[str, Any]:
+    """Logo-related fields of the settings document"""
+    settings = await settings_cache.get() or {}
+    return {k: settings[k] for k in LOGO_SETTINGS_FIELDS if k in settings}
+
+
+def logo_fingerprint(settings: Dict[str, Any]) -> str:
+    """Identifies the current logo; logo URLs are content-addressed"""
+    return settings.get('logo_url') or settings.get('logo_filename') or ''
+
+
+async def read_upload_limited(upload_file: UploadFile, max_bytes: int) -> bytes:
+    """Read an upload in chunks, aborting as soon as it exceeds max_bytes"""
+    chunks = []
+    total = 0
+    while True:
+        chunk = await upload_file.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        total += len(chunk)
+        if total > max_bytes:
+            raise HTTPException(status_code=413, detail=LOGO_TOO_LARGE_DETAIL)
+        chunks.append(chunk)
+    return b''.join(chunks)
+
+
+def remove_orphaned_uploads(referenced: set) -> List[str]:
+    """Delete logo files in upload_dir and logo_dir that settings no longer references"""
+    cutoff = datetime.now(timezone.utc).timestamp() - ORPHAN_GRACE_SECONDS
+    removed = []
+    for directory in (Path(upload_dir), logo_dir):
+        for path in directory.iterdir():
+            if not path.is_file() or str(path.resolve()) in referenced:
+                continue
+            try:
+                if path.stat().st_mtime > cutoff:
+                    continue
+                path.unlink()
+                removed.append(path.name)
+            except FileNotFoundError:
+                continue
+    return removed
+
+
+async def cleanup_orphaned_uploads() -> List[str]:
+    """Remove logo files left behind by earlier uploads (runs in a worker thread)"""
+    settings = await get_logo_settings()
+    referenced = {
+        str(Path(path).resolve())
+        for _, path in logo_file_refs(settings)
+        if path
+    }
+    return await asyncio.to_thread(remove_orphaned_uploads, referenced)
+
+
+def write_file_atomic(path: Path, contents: bytes) -> None:
+    """Write via a temp file + rename so readers never see a partial file"""
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    tmp_path.write_bytes(contents)
+    os.replace(tmp_path, path)
+
+
+async def store_logo_file(contents: bytes, content_type: str) -> Dict[str, Any]:
+    """Save one content-addressed image to GridFS and the local logo dir"""
+    digest = hashlib.sha256(contents).hexdigest()
+    name = f"{digest[:32]}{LOGO_EXTENSIONS.get(content_type, '.png')}"
+    file_path = logo_dir / name
+    
+    await asyncio.to_thread(write_file_atomic, file_path, contents)
+    file_id = await logo_bucket.upload_from_stream(
+        name,
+        contents,
+        metadata={"content_type": content_type, "sha256": digest}
+    )
+    
+    return {
+        "url": f"/uploads/logos/{name}",
+        "path": str(file_path),
+        "sha256": digest,
+        "content_type": content_type,
+        "size": len(contents),
+        "file_id": file_id,
+    }
+
+
+async def store_logo_variants(contents: bytes) -> Dict[str, Dict[str, Any]]:
+    """Resize/re-encode a logo off the event loop and store every variant"""
+    variants = await asyncio.to_thread(process_logo, contents)
+    stored = {}
+    for name, variant in variants.items():
+        stored[name] = {
+            **await store_logo_file(variant.data, variant.content_type),
+            "width": variant.width,
+            "height": variant.height,
+        }
+    return stored
+
+
+async def store_logo(
+    contents: bytes,
+    content_type: str,
+    original_filename: Optional[str],
+    with_variants: bool = True
+) -> Dict[str, Any]:
+    """Store the original logo plus its variants; returns the settings metadata.
+
+    Raises ValueError if the bytes are not a readable image (unless
+    with_variants is False, which stores the original as-is).
+    """
+    variants = await store_logo_variants(contents) if with_variants else {}
+    original = await store_logo_file(contents, content_type)
+    
+    return {
+        "logo_filename": original_filename,
+        "logo_path": original['path'],
+        "logo_url": original['url'],
+        "logo_sha256": original['sha256'],
+        "logo_content_type": content_type,
+        "logo_size": original['size'],
+        "logo_file_id": original['file_id'],
+        "logo_variants": variants,
+    }
+
+
+def logo_file_refs(settings: Dict[str, Any]) -> List[tuple]:
+    """(GridFS id, local path) of the original logo and every variant"""
+    refs = [(settings.get('logo_file_id'), settings.get('logo_path'))]
+    for variant in (settings.get('logo_variants') or {}).values():
+        refs.append((variant.get('file_id'), variant.get('path')))
+    return refs
+
+
+def public_logo_variants(settings: Dict[str, Any]) -> Dict[str, str]:
+    """Variant name -> URL, without internal storage fields"""
+    return {name: variant['url'] for name, variant in (settings.get('logo_variants') or {}).items()}
+
+
+async def restore_logo_file(name: str) -> bool:
+    """Copy a logo from GridFS back to the local logo dir"""
+    try:
+        grid_out = await logo_bucket.open_download_stream_by_name(name)
+        contents = await grid_out.read()
+    except NoFile:
+        return False
+    await asyncio.to_thread(write_file_atomic, logo_dir / name, contents)
+    return True
+
+
+async def remove_logo_files(settings: Dict[str, Any], keep_paths: Optional[set] = None) -> None:
+    """Delete a replaced logo and its variants from GridFS and local disk"""
+    keep_paths = keep_paths or set()
+    for file_id, path in logo_file_refs(settings):
+        if file_id:
+            try:
+                await logo_bucket.delete(file_id)
+            except NoFile:
+                pass
+        if path and path not in keep_paths:
+            try:
+                Path(path).unlink(missing_ok=True)
+            except Exception as e:
+                logging.warning(f"Could not delete logo file: {str(e)}")
+
+
+async def read_logo_file(logo_path: Optional[str]) -> Optional[bytes]:
+    """Read a stored logo file, restoring the local copy from GridFS if needed"""
+    if not logo_path:
+        return None
+    path = Path(logo_path)
+    if not path.is_file() and path.parent == logo_dir:
+        await restore_logo_file(path.name)
+    if path.is_file():
+        return await asyncio.to_thread(path.read_bytes)
+    return None
+
+
+async def load_logo_bytes(settings: Dict[str, Any]) -> Optional[bytes]:
+    """Logo bytes for document rendering, preferring the downscaled print variant"""
+    print_variant = (settings.get('logo_variants') or {}).get('print') or {}
+    contents = await read_logo_file(print_variant.get('path')) or await read_logo_file(settings.get('logo_path'))
+    if contents:
+        return contents
+    
+    # Not yet migrated by migrate_logo_base64
+    data_uri = settings.get('logo_base64')
+    if data_uri and ',' in data_uri:
+        return base64.b64decode(data_uri.split(',', 1)[1])
+    return None
+
+
+async def migrate_logo_base64() -> bool:
+    """Move a legacy logo_base64 data URI out of the settings document"""
+    settings = await db.settings.find_one(
+        {"_id": "app_settings", "logo_base64": {"$type": "string"}},
+        {"logo_base64": 1, "logo_filename": 1, "logo_path": 1}
+    )
+    if not settings:
+        return False
+    
+    match = re.match(r'^data:([^;]+);base64,(.*)$', settings['logo_base64'], re.DOTALL)
+    contents = None
+    if match:
+        try:
+            contents = base64.b64decode(match.group(2))
+        except ValueError as e:
+            logging.warning(f"⚠️ Dropping undecodable logo_base64 from settings {settings['_id']}: {str(e)}")
+    if contents:
+        try:
+            logo_meta = await store_logo(contents, match.group(1), settings.get('logo_filename'))
+        except ValueError as e:
+            # Keep the logo the user had, just without resized variants
+            logging.warning(f"⚠️ Logo in settings {settings['_id']} stored without variants: {str(e)}")
+            logo_meta = await store_logo(contents, match.group(1), settings.get('logo_filename'), with_variants=False)
+        await db.settings.update_one(
+            {"_id": "app_settings"},
+            {"$set": logo_meta, "$unset": {"logo_base64": ""}}
+        )
+        settings_cache.invalidate()
+        await remove_logo_files({"logo_path": settings.get('logo_path')}, keep_paths={logo_meta['logo_path']})
+    else:
+        await db.settings.update_one({"_id": "app_settings"}, {"$unset": {"logo_base64": ""}})
+        settings_cache.invalidate()
+    return True
+
+
+async def backfill_logo_variants() -> bool:
+    """Generate print/screen variants for a logo stored before they existed"""
+    settings = await get_logo_settings()
+    if not settings.get('logo_url') or settings.get('logo_variants'):
+        return False
+    
+    contents = await read_logo_file(settings.get('logo_path'))
+    if not contents:
+        return False
+    
+    try:
+        variants = await store_logo_variants(contents)
+    except ValueError as e:
+        logging.warning(f"Could not generate logo variants: {str(e)}")
+        return False
+    await db.settings.update_one({"_id": "app_settings"}, {"$set": {"logo_variants": variants}})
+    settings_cache.invalidate()
+    return True
+
+
+def parse_import_line(line: bytes, first: bool) -> Any:
+    """One NDJSON row: the parsed value, or the exception that stopped it"""
+    try:
+        return json.loads(line.decode('utf-8-sig' if first else 'utf-8'))
+    except ValueError as e:
+        return e
+
+
+async def read_import_rows(request: Request) -> AsyncIterator[tuple]:
+    """Yield (row_number, parsed_row_or_error) pairs from an import body.
+
+    A body starting with '[' is a JSON array and has to be read whole.
+    Anything else is NDJSON, parsed line by line as the body streams in,
+    with one PO per non-blank line so one bad line doesn't reject the rest.
+    """
+    buffer = b''
+    is_array = None
+    line_number = 0
+    async for chunk in request.stream():
+        buffer += chunk
+        if is_array is None:
+            head = buffer.removeprefix(UTF8_BOM).lstrip()
+            if not head:
+                continue
+            is_array = head.startswith(b'[')
+        if is_array:
+            continue
+        *lines, buffer = buffer.split(b'\n')
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                yield line_number, parse_import_line(line, line_number == 1)
+    
+    if is_array:
+        try:
+            rows = json.loads(buffer.decode('utf-8-sig'))
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail="Import body must be UTF-8 encoded")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON array: {str(e)}")
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=400, detail="Invalid JSON array")
+        for row_number, row in enumerate(rows, start=1):
+            yield row_number, row
+    elif buffer.strip():
+        yield line_number + 1, parse_import_line(buffer, line_number == 0)
+
+
+def prepare_import_chunk(chunk: List[tuple]) -> tuple:
+    """Validate import rows into documents; returns (docs, doc_rows, error results).
+
+    CPU-bound (Pydantic validation of every row), so callers run it in a thread.
+    """
+    docs = []
+    doc_rows = []
+    results = []
+    for row_number, row in chunk:
+        if isinstance(row, Exception):
+            results.append({"row": row_number, "status": "error", "error": f"Invalid JSON: {str(row)}"})
+            continue
+        if not isinstance(row, dict):
+            results.append({"row": row_number, "status": "error", "error": "Row must be a JSON object"})
+            continue
+        try:
+            po_dict = POCreate(**row).model_dump()
+            po_dict.update({k: row[k] for k in IMPORT_PRESERVED_FIELDS if row.get(k)})
+            for field in PO_TIMESTAMP_FIELDS:
+                if field in po_dict:
+                    try:
+                        po_dict[field] = utc_timestamp(po_dict[field])
+                    except (TypeError, ValueError):
+                        raise ValueError(f"Invalid {field}: {po_dict[field]!r}")
+            _, doc = build_po_document(po_dict)
+        except Exception as e:
+            results.append({"row": row_number, "status": "error", "error": str(e)})
+            continue
+        docs.append(doc)
+        doc_rows.append(row_number)
+    return docs, doc_rows, results
+
+
+async def import_po_chunk(chunk: List[tuple]) -> List[Dict[str, Any]]:
+    """Validate and insert one chunk of import rows; one result per row"""
+    # Blank numbers are allocated as POST /pos does; a number taken by a row
+    # that then fails validation is skipped, never reused
+    for _, row in chunk:
+        if isinstance(row, dict) and not str(row.get('po_number') or '').strip():
+            row['po_number'] = (await allocate_number(str(row.get('doc_type') or 'PO')))['number']
+    
+    docs, doc_rows, results = await asyncio.to_thread(prepare_import_chunk, chunk)
+    if not docs:
+        return results
+    
+    write_errors = {}
+    try:
+        await db.purchase_orders.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        for error in e.details.get('writeErrors', []):
+            if error.get('code') == 11000:
+                write_errors[error['index']] = "Duplicate id or po_number"
+            else:
+                write_errors[error['index']] = error.get('errmsg', 'Write failed')
+    
+    for index, (row_number, doc) in enumerate(zip(doc_rows, docs)):
+        if index in write_errors:
+            results.append({"row": row_number, "status": "error", "error": write_errors[index]})
+        else:
+            results.append({"row": row_number, "status": "ok", "id": doc['id'], "po_number": doc['po_number']})
+    return results
+
+
+def encode_cursor(created_at: Any, po_id: str) -> str:
+    """Encode the (created_at, id) sort key of the last row into an opaque cursor"""
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat()
+    raw = json.dumps([created_at, po_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """Decode a cursor produced by encode_cursor back into (created_at, id)"""
+    try:
+        created_at, po_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(created_at, str) or not isinstance(po_id, str):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return created_at, po_id
+
+
+def to_po_summary(po: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten a projected PO document into a POSummary dict"""
+    breakdown = po.get('size_colour_breakdown') or {}
+    totals = po.get('totals') or {}
+    created_at = po.get('created_at')
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat()
+    return {
+        "id": po['id'],
+        "doc_type": po.get('doc_type', 'PO'),
+        "po_number": po.get('po_number', ''),
+        "po_date": po.get('po_date', ''),
+        "delivery_date": po.get('delivery_date'),
+        "supplier_company": (po.get('supplier') or {}).get('company'),
+        "grand_total": totals.get('total_quantity', breakdown.get('grand_total') or 0),
+        "amount": totals.get('subtotal') or 0.0,
+        "created_at": created_at or "",
+    }
+
+
 # Routes
 @api_router.get("/")
 async def root():
     return {"message": "Newline Apparel PO Generator API"}
 
+@api_router.get("/health/live")
+async def liveness():
+    """The process is up and serving; never touches the database"""
+    return {"status": "ok"}
+
+@api_router.get("/health/ready")
+async def readiness():
+    """Ready once MongoDB answers and the current bootstrap has been applied"""
+    try:
+        await asyncio.wait_for(db.command("ping"), READINESS_TIMEOUT)
+        version = await asyncio.wait_for(bootstrap_version(), READINESS_TIMEOUT)
+    except Exception as e:
+        return JSONResponse(status_code=503, content={"status": "unavailable", "detail": f"Database unreachable: {str(e) or type(e).__name__}"})
+    if version is None or version < BOOTSTRAP_VERSION:
+        return JSONResponse(status_code=503, content={
+            "status": "unavailable",
+            "detail": "Database bootstrap pending; run `python migrate.py bootstrap`",
+            "bootstrap_version": version
+        })
+    return {"status": "ok", "bootstrap_version": version}
+
+@api_router.get("/health/pool")
+async def pool_stats():
+    """MongoDB connection pool usage for this worker, from PyMongo pool events"""
+    return {"options": MONGO_POOL_OPTIONS, **pool_metrics.snapshot()}
+
 @api_router.post("/pos", response_model=PurchaseOrder)
 async def create_po(po_data: POCreate):
+    # A blank number means "allocate on save" (lazy numbering)
+    if not po_data.po_number.strip():
+        po_data.po_number = (await allocate_number(po_data.doc_type))['number']
+    
     try:
-        # Convert to dict for manipulation
-        po_dict = po_data.model_dump()
-        
-        # If colors/size_range not provided in order_lines, derive from breakdown
-        breakdown_colors = po_dict.get('size_colour_breakdown', {}).get('colors', [])
-        breakdown_sizes = po_dict.get('size_colour_breakdown', {}).get('sizes', [])
-        
-        # Extract color names if colors are objects
-        color_names = []
-        if breakdown_colors:
-            for c in breakdown_colors:
-                if isinstance(c, dict):
-                    color_names.append(c.get('name', ''))
-                else:
-                    color_names.append(c)
-        
-        for line in po_dict.get('order_lines', []):
-            if not line.get('colors'):
-                line['colors'] = color_names
-            if not line.get('size_range'):
-                line['size_range'] = breakdown_sizes
-        
-        po_obj = PurchaseOrder(**po_dict)
-        doc = po_obj.model_dump()
-        doc['created_at'] = doc['created_at'].isoformat()
-        doc['updated_at'] = doc['updated_at'].isoformat()
+        po_obj, doc = build_po_document(po_data.model_dump())
         
         await db.purchase_orders.insert_one(doc)
         return po_obj
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=409,
+            detail=f"A document with number '{po_data.po_number}' already exists"
+        )
     except Exception as e:
         logging.error(f"Error creating PO: {str(e)}")
         raise HTTPException(
@@ -300,94 +1491,378 @@ async def create_po(po_data: POCreate):
             detail=f"Validation error creating PO: {str(e)}"
         )
 
-@api_router.get("/pos", response_model=List[PurchaseOrder])
+@api_router.post("/pos/import")
+async def import_pos(request: Request):
+    """Bulk-create POs from a JSON array or NDJSON body.
+
+    Rows are validated like POST /pos (POCreate, then PurchaseOrder), in a
+    worker thread, and written per chunk with an unordered insert_many;
+    rows with a blank po_number get the next number. NDJSON is processed
+    as it streams in. The response reports success or the error for every row.
+    """
+    results = []
+    chunk = []
+    async for item in read_import_rows(request):
+        chunk.append(item)
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            results.extend(await import_po_chunk(chunk))
+            chunk = []
+    if chunk:
+        results.extend(await import_po_chunk(chunk))
+    
+    results.sort(key=lambda r: r['row'])
+    inserted = sum(1 for r in results if r['status'] == "ok")
+    return {
+        "total": len(results),
+        "inserted": inserted,
+        "failed": len(results) - inserted,
+        "results": results
+    }
+
+@api_router.get("/pos")
 async def get_all_pos(search: Optional[str] = None, supplier: Optional[str] = None):
-    query = {}
-    
-    if search:
-        query["$or"] = [
-            {"po_number": {"$regex": search, "$options": "i"}},
-            {"supplier.company": {"$regex": search, "$options": "i"}}
-        ]
-    
-    if supplier:
-        query["supplier.company"] = {"$regex": supplier, "$options": "i"}
-    
-    pos = await db.purchase_orders.find(query, {"_id": 0}).to_list(1000)
+    """Every matching PO as one JSON array of PurchaseOrder objects.
+
+    The array is streamed from the cursor in batches instead of being
+    collected (and capped) in memory; use /pos/summary for paging.
+    """
+    query = build_po_query(search, supplier)
+    cursor = db.purchase_orders.find(query, PO_READ_PROJECTION).batch_size(EXPORT_BATCH_SIZE)
+    
+    async def generate_array():
+        separator = b"["
+        batch = []
+        async for po in cursor:
+            batch.append(separator + orjson.dumps(po_response_data(po)))
+            separator = b","
+            if len(batch) >= EXPORT_BATCH_SIZE:
+                yield b"".join(batch)
+                batch = []
+        yield b"".join(batch) + (b"]" if separator == b"," else b"[]")
+    
+    return StreamingResponse(generate_array(), media_type="application/json")
+
+@api_router.get("/pos/summary", response_model=POSummaryPage)
+async def get_po_summaries(
+    search: Optional[str] = None,
+    supplier: Optional[str] = None,
+    doc_type: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = PO_PAGE_DEFAULT_LIMIT
+):
+    """Keyset-paginated PO list (newest first) with a summary projection"""
+    limit = max(1, min(limit, PO_PAGE_MAX_LIMIT))
+    query = build_po_query(search, supplier)
+    
+    if doc_type:
+        query["doc_type"] = doc_type
+    
+    if cursor:
+        created_at, po_id = decode_cursor(cursor)
+        query = {"$and": [query, {"$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "id": {"$lt": po_id}}
+        ]}]}
+    
+    # Fetch one extra row to know whether another page exists
+    pos = await db.purchase_orders.find(query, PO_SUMMARY_PROJECTION) \
+        .sort([("created_at", -1), ("id", -1)]) \
+        .limit(limit + 1) \
+        .to_list(limit + 1)
+    
+    next_cursor = None
+    if len(pos) > limit:
+        pos = pos[:limit]
+        last = pos[-1]
+        next_cursor = encode_cursor(last.get('created_at', ''), last['id'])
     
-    for po in pos:
-        if isinstance(po['created_at'], str):
-            po['created_at'] = datetime.fromisoformat(po['created_at'])
-        if isinstance(po['updated_at'], str):
-            po['updated_at'] = datetime.fromisoformat(po['updated_at'])
+    return {
+        "items": [to_po_summary(po) for po in pos],
+        "next_cursor": next_cursor,
+        "limit": limit
+    }
+
+@api_router.get("/pos/search", response_model=List[POSummary])
+async def search_pos(
+    q: str,
+    mode: str = "prefix",
+    doc_type: Optional[str] = None,
+    limit: int = SEARCH_DEFAULT_LIMIT
+):
+    """Ranked PO search by number or supplier.
+
+    mode=prefix (default) matches token prefixes via the `search_keys` index;
+    mode=text uses the MongoDB text index and its relevance score.
+    """
+    limit = max(1, min(limit, PO_PAGE_MAX_LIMIT))
+    
+    if mode == "prefix":
+        tokens = [t[:SEARCH_PREFIX_MAX] for t in search_tokens(q)]
+        if not tokens:
+            return []
+        query = build_po_query(search=q)
+        if doc_type:
+            query = {"$and": [query, {"doc_type": doc_type}]}
+        candidates = await db.purchase_orders.find(query, PO_SUMMARY_PROJECTION) \
+            .sort([("created_at", -1), ("id", -1)]) \
+            .limit(SEARCH_CANDIDATE_LIMIT) \
+            .to_list(SEARCH_CANDIDATE_LIMIT)
+        # Stable sort keeps newest-first order among equal scores
+        candidates.sort(key=lambda po: rank_search_match(po, tokens), reverse=True)
+        return [to_po_summary(po) for po in candidates[:limit]]
+    
+    if mode == "text":
+        query = {"$text": {"$search": q}}
+        if doc_type:
+            query["doc_type"] = doc_type
+        projection = {**PO_SUMMARY_PROJECTION, "score": {"$meta": "textScore"}}
+        pos = await db.purchase_orders.find(query, projection) \
+            .sort([("score", {"$meta": "textScore"})]) \
+            .limit(limit) \
+            .to_list(limit)
+        return [to_po_summary(po) for po in pos]
+    
+    raise HTTPException(status_code=400, detail="mode must be 'prefix' or 'text'")
+
+@api_router.get("/pos/export")
+async def export_pos(
+    format: str = "ndjson",
+    rows: str = "lines",
+    search: Optional[str] = None,
+    supplier: Optional[str] = None,
+    doc_type: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None
+):
+    """Stream POs as NDJSON (one document per line) or flattened CSV.
+
+    CSV rows are one per order line (rows=lines) or one per colour x size
+    cell of the matrix (rows=cells). The Motor cursor is consumed in batches,
+    so memory stays constant regardless of how many POs are exported.
+    """
+    if format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'csv'")
+    if format == "csv" and rows not in CSV_LAYOUTS:
+        raise HTTPException(status_code=400, detail=f"rows must be one of: {', '.join(CSV_LAYOUTS)}")
+    
+    validate_date_range(date_from, date_to)
+    
+    query = {**build_po_query(search, supplier), **match_stage(date_from, date_to, doc_type)["$match"]}
+    cursor = db.purchase_orders.find(query, EXPORT_PROJECTION) \
+        .sort([("created_at", 1), ("id", 1)]) \
+        .batch_size(EXPORT_BATCH_SIZE)
+    timestamp = datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')
+    
+    if format == "ndjson":
+        async def generate_ndjson():
+            batch = []
+            async for po in cursor:
+                batch.append(ndjson_line(po))
+                if len(batch) >= EXPORT_BATCH_SIZE:
+                    yield "".join(batch)
+                    batch = []
+            if batch:
+                yield "".join(batch)
+        
+        return StreamingResponse(
+            generate_ndjson(),
+            media_type="application/x-ndjson",
+            headers={"Content-Disposition": f'attachment; filename="pos_{timestamp}.ndjson"'}
+        )
     
-    return pos
+    columns, row_builder = CSV_LAYOUTS[rows]
+    
+    async def generate_csv():
+        yield csv_chunk([columns])
+        batch = []
+        async for po in cursor:
+            batch.extend(row_builder(po))
+            if len(batch) >= EXPORT_BATCH_SIZE:
+                yield csv_chunk(batch)
+                batch = []
+        if batch:
+            yield csv_chunk(batch)
+    
+    return StreamingResponse(
+        generate_csv(),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="pos_{rows}_{timestamp}.csv"'}
+    )
 
 @api_router.get("/pos/{po_id}", response_model=PurchaseOrder)
 async def get_po(po_id: str):
-    po = await db.purchase_orders.find_one({"id": po_id}, {"_id": 0})
+    po = await db.purchase_orders.find_one({"id": po_id}, PO_READ_PROJECTION)
     
     if not po:
         raise HTTPException(status_code=404, detail="PO not found")
     
-    if isinstance(po['created_at'], str):
-        po['created_at'] = datetime.fromisoformat(po['created_at'])
-    if isinstance(po['updated_at'], str):
-        po['updated_at'] = datetime.fromisoformat(po['updated_at'])
-    
-    return po
+    return ORJSONResponse(po_response_data(po))
+
+# Stored values derived from several fields, and the fields they depend on
+TOTALS_INPUT_FIELDS = {'order_lines', 'size_colour_breakdown', 'tax_details'}
+SEARCH_KEY_INPUT_FIELDS = {'po_number', 'supplier'}
+
+def revision_filter(revision: int) -> Any:
+    # Documents saved before revisions existed have no field; treat them as 0
+    return revision if revision else {"$in": [0, None]}
+
+def stored_revision(po: Dict[str, Any]) -> int:
+    return po.get('revision') or 0
+
+def revision_conflict(current_revision: int) -> HTTPException:
+    return HTTPException(
+        status_code=409,
+        detail={
+            "message": "This document was changed by someone else. Reload it to see the latest version.",
+            "current_revision": current_revision
+        }
+    )
+
+async def raise_update_failure(po_id: str) -> None:
+    """After a conditional update matched nothing, tell "gone" apart from "changed meanwhile" """
+    current = await db.purchase_orders.find_one({"id": po_id}, {"_id": 0, "revision": 1})
+    if not current:
+        raise HTTPException(status_code=404, detail="PO not found")
+    raise revision_conflict(stored_revision(current))
 
 @api_router.put("/pos/{po_id}", response_model=PurchaseOrder)
 async def update_po(po_id: str, po_update: POUpdate):
-    existing_po = await db.purchase_orders.find_one({"id": po_id}, {"_id": 0})
+    """Apply an update in a single find_one_and_update.
+
+    When `revision` is given the write only succeeds if the stored document
+    is still at that revision; otherwise it fails with 409 so a save from
+    another tab is never silently overwritten. The existing document is
+    only read when a partial update changes some, but not all, of the
+    inputs to the stored totals or search keys.
+    """
+    update_data = po_update.model_dump(exclude_unset=True)
+    expected_revision = update_data.pop('revision', None)
+    query = {"id": po_id}
+    
+    # If colors/size_range not provided in order_lines, derive from breakdown
+    if 'order_lines' in update_data and 'size_colour_breakdown' in update_data:
+        fill_order_line_defaults(update_data['order_lines'], update_data['size_colour_breakdown'])
+    
+    missing = set()
+    if TOTALS_INPUT_FIELDS & update_data.keys():
+        missing |= TOTALS_INPUT_FIELDS - update_data.keys()
+    if SEARCH_KEY_INPUT_FIELDS & update_data.keys():
+        missing |= SEARCH_KEY_INPUT_FIELDS - update_data.keys()
+    
+    existing_po = {}
+    if missing:
+        existing_po = await db.purchase_orders.find_one(
+            {"id": po_id},
+            {"_id": 0, "revision": 1, **{field: 1 for field in missing}}
+        )
+        if not existing_po:
+            raise HTTPException(status_code=404, detail="PO not found")
+        # Derived values are computed from what we just read, so the write
+        # must land on that same revision
+        if expected_revision is None:
+            expected_revision = stored_revision(existing_po)
     
-    if not existing_po:
-        raise HTTPException(status_code=404, detail="PO not found")
+    if expected_revision is not None:
+        query['revision'] = revision_filter(expected_revision)
+    
+    merged = {**existing_po, **update_data}
+    update_data['updated_at'] = datetime.now(timezone.utc).isoformat()
+    
+    if TOTALS_INPUT_FIELDS & update_data.keys():
+        update_data['totals'] = compute_po_totals(merged)
+    
+    if SEARCH_KEY_INPUT_FIELDS & update_data.keys():
+        update_data['search_keys'] = build_search_keys(
+            merged.get('po_number'),
+            (merged.get('supplier') or {}).get('company')
+        )
+    
+    update = {"$set": update_data}
+    if expected_revision is None:
+        update["$inc"] = {"revision": 1}
+    else:
+        # Set rather than $inc: a legacy document may hold revision: null
+        update_data['revision'] = expected_revision + 1
     
     try:
-        update_data = po_update.model_dump(exclude_unset=True)
-        
-        # If colors/size_range not provided in order_lines, derive from breakdown
-        if 'order_lines' in update_data and 'size_colour_breakdown' in update_data:
-            breakdown_colors = update_data['size_colour_breakdown'].get('colors', [])
-            breakdown_sizes = update_data['size_colour_breakdown'].get('sizes', [])
-            
-            # Extract color names if colors are objects
-            color_names = []
-            if breakdown_colors:
-                for c in breakdown_colors:
-                    if isinstance(c, dict):
-                        color_names.append(c.get('name', ''))
-                    else:
-                        color_names.append(c)
-            
-            for line in update_data['order_lines']:
-                if not line.get('colors'):
-                    line['colors'] = color_names
-                if not line.get('size_range'):
-                    line['size_range'] = breakdown_sizes
-        
-        update_data['updated_at'] = datetime.now(timezone.utc).isoformat()
-        
-        await db.purchase_orders.update_one(
-            {"id": po_id},
-            {"$set": update_data}
+        updated_po = await db.purchase_orders.find_one_and_update(
+            query,
+            update,
+            projection=PO_READ_PROJECTION,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=409,
+            detail=f"A document with number '{po_update.po_number}' already exists"
         )
-        
-        updated_po = await db.purchase_orders.find_one({"id": po_id}, {"_id": 0})
-        
-        if isinstance(updated_po['created_at'], str):
-            updated_po['created_at'] = datetime.fromisoformat(updated_po['created_at'])
-        if isinstance(updated_po['updated_at'], str):
-            updated_po['updated_at'] = datetime.fromisoformat(updated_po['updated_at'])
-        
-        return updated_po
     except Exception as e:
         logging.error(f"Error updating PO: {str(e)}")
         raise HTTPException(
             status_code=422,
             detail=f"Validation error updating PO: {str(e)}"
         )
+    
+    if updated_po is None:
+        await raise_update_failure(po_id)
+    
+    await asyncio.to_thread(pdf_cache.invalidate, po_id)
+    
+    return ORJSONResponse(po_response_data(updated_po))
+
+@api_router.patch("/pos/{po_id}")
+async def patch_po(po_id: str, patch: POPatch):
+    """Apply targeted matrix-cell and order-line edits.
+
+    Only the touched paths are $set/$unset; totals and the matrix
+    grand_total are recomputed server-side. Returns the new revision and
+    totals rather than the whole document.
+    """
+    if not patch.operations:
+        raise HTTPException(status_code=422, detail="No operations given")
+    
+    existing_po = await db.purchase_orders.find_one(
+        {"id": po_id},
+        {"_id": 0, "revision": 1, **{field: 1 for field in PATCH_INPUT_FIELDS}}
+    )
+    if not existing_po:
+        raise HTTPException(status_code=404, detail="PO not found")
+    current_revision = stored_revision(existing_po)
+    if patch.revision is not None and patch.revision != current_revision:
+        raise revision_conflict(current_revision)
+    
+    breakdown = existing_po.get('size_colour_breakdown') or {}
+    
+    def validate_line(line: Dict[str, Any]) -> Dict[str, Any]:
+        fill_order_line_defaults([line], breakdown)
+        return OrderLine(**line).model_dump()
+    
+    try:
+        patched, set_fields, unset_fields = apply_patch(existing_po, patch.operations, validate_line)
+    except PatchError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    totals = compute_po_totals(patched)
+    set_fields['totals'] = totals
+    set_fields['size_colour_breakdown.grand_total'] = totals['total_quantity']
+    set_fields['updated_at'] = datetime.now(timezone.utc).isoformat()
+    set_fields['revision'] = current_revision + 1
+    update = {"$set": set_fields}
+    if unset_fields:
+        update["$unset"] = {path: "" for path in unset_fields}
+    
+    # Totals were computed from the revision we read, so only write onto it
+    result = await db.purchase_orders.find_one_and_update(
+        {"id": po_id, "revision": revision_filter(current_revision)},
+        update,
+        projection={"_id": 0, "revision": 1, "totals": 1, "updated_at": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if result is None:
+        await raise_update_failure(po_id)
+    
+    await asyncio.to_thread(pdf_cache.invalidate, po_id)
+    return result
 
 @api_router.delete("/pos/{po_id}")
 async def delete_po(po_id: str):
@@ -396,58 +1871,76 @@ async def delete_po(po_id: str):
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="PO not found")
     
+    await asyncio.to_thread(pdf_cache.invalidate, po_id)
     return {"message": "PO deleted successfully"}
 
+@api_router.get("/pos/{po_id}/pdf")
+async def get_po_pdf(po_id: str, request: Request):
+    """Render a PO/PI to PDF on the server, served from the disk cache when unchanged"""
+    po = await db.purchase_orders.find_one({"id": po_id}, {"_id": 0, "search_keys": 0})
+    if not po:
+        raise HTTPException(status_code=404, detail="PO not found")
+    
+    logo_settings = await get_logo_settings()
+    cache_key = PDFCache.make_key(po, logo_fingerprint(logo_settings), RENDER_VERSION)
+    etag = f'"{cache_key}"'
+    filename = re.sub(r'[^a-zA-Z0-9._-]', '_', po.get('po_number') or po_id)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache",
+        "Content-Disposition": f'inline; filename="{filename}.pdf"'
+    }
+    
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    
+    pdf_bytes = await asyncio.to_thread(pdf_cache.get, po_id, cache_key)
+    if pdf_bytes is None:
+        logo_bytes = await load_logo_bytes(logo_settings)
+        try:
+            loop = asyncio.get_running_loop()
+            pdf_bytes = await loop.run_in_executor(get_pdf_executor(), render_po_pdf, po, logo_bytes)
+        except Exception as e:
+            logging.error(f"Error rendering PDF for PO {po_id}: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Error rendering PDF: {str(e)}")
+        await asyncio.to_thread(pdf_cache.put, po_id, cache_key, pdf_bytes)
+    
+    return Response(content=pdf_bytes, media_type="application/pdf", headers=headers)
+
 @api_router.post("/pos/{po_id}/duplicate")
 async def duplicate_po(po_id: str):
     """Duplicate a PO/PI - creates new draft with fresh number and today's dates"""
     # Get original document
-    original = await db.purchase_orders.find_one({"id": po_id})
+    original = await db.purchase_orders.find_one({"id": po_id}, PO_READ_PROJECTION)
     if not original:
         raise HTTPException(status_code=404, detail="PO not found")
     
-    # Create new document
-    new_doc = dict(original)
-    new_doc['id'] = str(uuid.uuid4())
-    # Remove _id so MongoDB generates a new one
-    if '_id' in new_doc:
-        del new_doc['_id']
+    # Rebuild from the API form so the copy gets a new id, fresh
+    # created_at/updated_at (it lists first, newest-first) and the current schema
+    new_po = po_response_data(original)
+    for field in ('id', 'created_at', 'updated_at'):
+        new_po.pop(field, None)
     
     # Get next number based on doc_type
-    doc_type = new_doc.get('doc_type', 'PO')
-    if doc_type == 'PI':
-        result = await db.settings.find_one_and_update(
-            {"_id": "app_settings"},
-            {"$inc": {"next_pi_number": 1}},
-            return_document=True
-        )
-        number = result.get('next_pi_number', 1)
-        prefix = result.get('pi_prefix', 'PI/').rstrip('/')
-    else:
-        result = await db.settings.find_one_and_update(
-            {"_id": "app_settings"},
-            {"$inc": {"next_po_number": 1}},
-            return_document=True
-        )
-        number = result.get('next_po_number', 1)
-        prefix = result.get('po_prefix', 'NA/').rstrip('/')
-    
-    # Format number
-    current_date = datetime.now(timezone.utc)
-    date_str = current_date.strftime('%d%m%y')
-    number_str = str(number).zfill(4)
-    new_doc['po_number'] = f"{prefix}/{date_str}/{number_str}"
+    allocated = await allocate_number(new_po.get('doc_type', 'PO'))
+    new_po['po_number'] = allocated['number']
     
     # Reset dates to today
-    today = current_date.strftime('%Y-%m-%d')
-    new_doc['po_date'] = today
-    new_doc['delivery_date'] = today
+    today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+    new_po['po_date'] = today
+    new_po['delivery_date'] = today
+    new_po['revision'] = 0
     
-    # Insert new document
-    result = await db.purchase_orders.insert_one(new_doc)
-    new_doc['_id'] = str(result.inserted_id)
+    try:
+        _, new_doc = build_po_document(new_po)
+        await db.purchase_orders.insert_one(new_doc)
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=409,
+            detail=f"A document with number '{new_po['po_number']}' already exists"
+        )
     
-    return new_doc
+    return ORJSONResponse(po_response_data({k: v for k, v in new_doc.items() if k not in PO_READ_PROJECTION}))
 
 @api_router.get("/buyer-info")
 async def get_buyer_info():
@@ -485,49 +1978,37 @@ async def upload_logo(
             detail=f"Invalid file type '{upload_file.content_type}'. Only PNG, JPG, and JPEG files are allowed."
         )
     
-    # Read and validate file size (max 5MB)
-    contents = await upload_file.read()
-    if len(contents) > 5 * 1024 * 1024:
-        raise HTTPException(
-            status_code=422,
-            detail="File size must be less than 5MB"
-        )
+    # Read and validate file size (max 5MB) without buffering past the limit
+    contents = await read_upload_limited(upload_file, LOGO_MAX_BYTES)
     
     try:
-        # Convert to base64 for database storage
-        logo_base64 = base64.b64encode(contents).decode('utf-8')
-        data_uri = f"data:{upload_file.content_type};base64,{logo_base64}"
-        
-        # Also save as file for static serving
-        safe_name = sanitize_filename(upload_file.filename)
-        file_path = Path(upload_dir).resolve() / safe_name
-        
-        with open(file_path, 'wb') as f:
-            f.write(contents)
-        
-        # Save to settings collection
-        settings_doc = {
-            "_id": "app_settings",
-            "logo_base64": data_uri,
-            "logo_filename": upload_file.filename,
-            "logo_path": str(file_path),
-            "logo_url": f"/uploads/{safe_name}",
-            "updated_at": datetime.now(timezone.utc).isoformat()
-        }
+        previous = await get_logo_settings()
+        logo_meta = await store_logo(contents, upload_file.content_type, upload_file.filename)
         
         await db.settings.update_one(
             {"_id": "app_settings"},
-            {"$set": settings_doc},
+            {
+                "$set": {**logo_meta, "updated_at": datetime.now(timezone.utc).isoformat()},
+                "$unset": {"logo_base64": ""}
+            },
             upsert=True
         )
+        settings_cache.invalidate()
+        await remove_logo_files(previous, keep_paths={path for _, path in logo_file_refs(logo_meta)})
+        await asyncio.to_thread(pdf_cache.clear)
+        await cleanup_orphaned_uploads()
         
         return {
             "message": "Logo uploaded successfully",
-            "logo_base64": data_uri,
             "filename": upload_file.filename,
-            "url": f"/uploads/{safe_name}",
-            "path": str(file_path)
+            "url": logo_meta['logo_url'],
+            "logo_url": logo_meta['logo_url'],
+            "logo_sha256": logo_meta['logo_sha256'],
+            "logo_variants": public_logo_variants(logo_meta),
+            "size": logo_meta['logo_size']
         }
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         logging.error(f"Error uploading logo: {str(e)}")
         raise HTTPException(
@@ -537,71 +2018,81 @@ async def upload_logo(
 
 @api_router.get("/settings/logo")
 async def get_logo():
-    settings = await db.settings.find_one({"_id": "app_settings"}, {"_id": 0})
+    """Logo metadata only; the image itself is served from logo_url"""
+    settings = await get_logo_settings()
     
-    if not settings or not settings.get('logo_base64'):
-        return {"logo_base64": None, "logo_filename": None}
+    if not settings.get('logo_url'):
+        return {"logo_url": None, "logo_filename": None, "logo_variants": {}}
     
     return {
-        "logo_base64": settings.get('logo_base64'),
+        "logo_url": settings.get('logo_url'),
         "logo_filename": settings.get('logo_filename'),
-        "logo_url": settings.get('logo_url')
+        "logo_variants": public_logo_variants(settings)
     }
 
 @api_router.delete("/settings/logo")
 async def delete_logo():
-    settings = await db.settings.find_one({"_id": "app_settings"}, {"_id": 0})
+    settings = await get_logo_settings()
     
-    # Delete physical file if exists
-    if settings and settings.get('logo_path'):
-        try:
-            Path(settings['logo_path']).unlink(missing_ok=True)
-        except Exception as e:
-            logging.warning(f"Could not delete logo file: {str(e)}")
+    # Delete stored logo (GridFS and local copy) if present
+    await remove_logo_files(settings)
     
     await db.settings.update_one(
         {"_id": "app_settings"},
-        {"$set": {
-            "logo_base64": None,
-            "logo_filename": None,
-            "logo_path": None,
-            "logo_url": None,
-            "updated_at": datetime.now(timezone.utc).isoformat()
-        }},
+        {
+            "$set": {
+                "logo_filename": None,
+                "logo_path": None,
+                "logo_url": None,
+                "logo_sha256": None,
+                "logo_file_id": None,
+                "logo_variants": None,
+                "updated_at": datetime.now(timezone.utc).isoformat()
+            },
+            "$unset": {"logo_base64": ""}
+        },
         upsert=True
     )
+    settings_cache.invalidate()
+    await asyncio.to_thread(pdf_cache.clear)
     
     return {"message": "Logo deleted successfully"}
 
 
 # Settings endpoints for PO/PI auto-increment
+# Internal logo storage fields never leave the server
+SETTINGS_PRIVATE_FIELDS = ('logo_base64', 'logo_path', 'logo_file_id')
+
 @api_router.get("/settings")
 async def get_settings():
-    """Get all app settings including PO/PI counters"""
-    settings = await db.settings.find_one({"_id": "app_settings"})
+    """Get all app settings (numbering prefixes and flags, pricing, logo)"""
+    settings = await settings_cache.get()
     
     if not settings:
         # Create default settings
         default_settings = {
             "_id": "app_settings",
-            "next_po_number": 1,
             "po_prefix": "NA/",
             "use_po_prefix": False,
-            "next_pi_number": 1,
             "pi_prefix": "PI/",
             "use_pi_prefix": False,
             "default_unit_price": 0.0,
-            "logo_base64": None,
             "logo_filename": None,
             "updated_at": datetime.now(timezone.utc).isoformat()
         }
         await db.settings.insert_one(default_settings)
+        settings_cache.invalidate()
         settings = default_settings
     
+    for field in SETTINGS_PRIVATE_FIELDS:
+        settings.pop(field, None)
+    
     # Ensure default_unit_price exists in response (for backward compatibility)
     if 'default_unit_price' not in settings:
         settings['default_unit_price'] = 0.0
     
+    settings['logo_variants'] = public_logo_variants(settings)
+    
     # Remove _id from response
     settings.pop('_id', None)
     return settings
@@ -610,9 +2101,9 @@ async def get_settings():
 @api_router.patch("/settings")
 @api_router.put("/settings")
 async def update_settings(settings_update: Dict[str, Any]):
-    """Update app settings (PO/PI prefixes, flags, and default pricing)"""
+    """Update app settings (PO/PI prefixes, flags, numbering mode, and default pricing)"""
     # Only allow updating specific fields
-    allowed_fields = ['po_prefix', 'use_po_prefix', 'pi_prefix', 'use_pi_prefix', 'default_unit_price']
+    allowed_fields = ['po_prefix', 'use_po_prefix', 'pi_prefix', 'use_pi_prefix', 'default_unit_price', 'lazy_numbering']
     update_data = {k: v for k, v in settings_update.items() if k in allowed_fields}
     
     if not update_data:
@@ -625,98 +2116,174 @@ async def update_settings(settings_update: Dict[str, Any]):
         {"$set": update_data},
         upsert=True
     )
+    settings_cache.invalidate()
     
     return {"message": "Settings updated successfully", "updated_fields": list(update_data.keys())}
 
 
-@api_router.post("/po/next-number")
-async def get_next_po_number():
-    """Atomically get and increment PO number with format: NA/DDMMYY/XXXX"""
-    # Find and update atomically
-    result = await db.settings.find_one_and_update(
-        {"_id": "app_settings"},
-        {"$inc": {"next_po_number": 1}},
-        return_document=True,
-        upsert=True
-    )
-    
-    if not result:
-        raise HTTPException(status_code=500, detail="Failed to generate PO number")
-    
-    # Get the number (after increment, so we need to use it as-is)
-    number = result.get('next_po_number', 1)
-    prefix = result.get('po_prefix', 'NA/')
-    
-    # Remove trailing slash from prefix if present
-    prefix = prefix.rstrip('/')
-    
-    # Format: NA/DDMMYY/XXXX
-    # Get current date in ddmmyy format
-    current_date = datetime.now(timezone.utc)
-    date_str = current_date.strftime('%d%m%y')  # e.g., 181025
-    
-    # Pad number to 4 digits
-    number_str = str(number).zfill(4)  # e.g., 0001, 1403
+async def number_prefix(doc_type: str) -> str:
+    """Configured number prefix for a doc_type"""
+    settings = await settings_cache.get() or {}
+    if doc_type == 'PI':
+        return settings.get('pi_prefix', 'PI/')
+    return settings.get('po_prefix', 'NA/')
+
+
+async def allocate_number(doc_type: str) -> Dict[str, Any]:
+    """Allocate the next PO/PI number in the format PREFIX/DDMMYY/XXXX"""
+    doc_type = 'PI' if doc_type == 'PI' else 'PO'
+    prefix = await number_prefix(doc_type)
     
-    # Compose final number: NA/181025/1403
-    final_number = f"{prefix}/{date_str}/{number_str}"
+    # The XXXX sequence restarts every day and for every prefix
+    date_str = number_date()
+    number = await number_allocator.next_number(doc_type, prefix, date_str)
     
     return {
-        "number": final_number,
+        "number": format_number(prefix, date_str, number),
         "raw_number": number,
         "date": date_str,
-        "formatted_number": number_str
+        "formatted_number": str(number).zfill(4)
     }
 
 
+@api_router.post("/po/next-number")
+async def get_next_po_number():
+    """Allocate the next PO number with format: NA/DDMMYY/XXXX"""
+    return await allocate_number('PO')
+
+
 @api_router.post("/pi/next-number")
 async def get_next_pi_number():
-    """Atomically get and increment PI number with format: PI/DDMMYY/XXXX"""
-    # Find and update atomically
-    result = await db.settings.find_one_and_update(
-        {"_id": "app_settings"},
-        {"$inc": {"next_pi_number": 1}},
-        return_document=True,
-        upsert=True
-    )
-    
-    if not result:
-        raise HTTPException(status_code=500, detail="Failed to generate PI number")
-    
-    # Get the number (after increment, so we need to use it as-is)
-    number = result.get('next_pi_number', 1)
-    prefix = result.get('pi_prefix', 'PI/')
-    
-    # Remove trailing slash from prefix if present
-    prefix = prefix.rstrip('/')
-    
-    # Format: PI/DDMMYY/XXXX
-    # Get current date in ddmmyy format
-    current_date = datetime.now(timezone.utc)
-    date_str = current_date.strftime('%d%m%y')  # e.g., 011125
-    
-    # Pad number to 4 digits
-    number_str = str(number).zfill(4)  # e.g., 0001, 1403
+    """Allocate the next PI number with format: PI/DDMMYY/XXXX"""
+    return await allocate_number('PI')
+
+
+async def allocate_number_range(doc_type: str, count: int) -> Dict[str, Any]:
+    """Reserve `count` consecutive numbers with a single $inc.
+
+    Bypasses this worker's leased block so the range is always contiguous.
+    """
+    if count < 1 or count > NUMBER_BATCH_MAX:
+        raise HTTPException(status_code=422, detail=f"count must be between 1 and {NUMBER_BATCH_MAX}")
     
-    # Compose final number: PI/011125/0001
-    final_number = f"{prefix}/{date_str}/{number_str}"
+    prefix = await number_prefix(doc_type)
+    date_str = number_date()
+    first, last = await number_allocator.reserve_range(doc_type, prefix, date_str, count)
     
     return {
-        "number": final_number,
-        "raw_number": number,
+        "numbers": [format_number(prefix, date_str, n) for n in range(first, last + 1)],
+        "first_raw_number": first,
+        "last_raw_number": last,
         "date": date_str,
-        "formatted_number": number_str
+        "count": count
     }
 
 
+@api_router.post("/po/next-numbers")
+async def get_next_po_numbers(count: int = 1):
+    """Reserve a contiguous block of PO numbers for bulk creation"""
+    return await allocate_number_range('PO', count)
+
+
+@api_router.post("/pi/next-numbers")
+async def get_next_pi_numbers(count: int = 1):
+    """Reserve a contiguous block of PI numbers for bulk creation"""
+    return await allocate_number_range('PI', count)
+
+
+# The editor only reads these settings; the logo stays out of its payload
+EDITOR_SETTINGS_FIELDS = ('default_unit_price', 'lazy_numbering')
+
+@api_router.post("/editor/bootstrap")
+async def editor_bootstrap(po_id: Optional[str] = None, doc_type: Optional[str] = None):
+    """Everything POEditor needs on open, in one round trip.
+
+    Suppliers are left out; the editor looks them up via /suppliers/suggest.
+    Pass po_id to load an existing document, or doc_type (PO or PI) to
+    reserve the next number for a new one (skipped with lazy_numbering).
+    """
+    if doc_type is not None and doc_type not in ('PO', 'PI'):
+        raise HTTPException(status_code=422, detail="doc_type must be PO or PI")
+    
+    async def load_po():
+        if not po_id:
+            return None
+        po = await db.purchase_orders.find_one({"id": po_id}, PO_READ_PROJECTION)
+        if not po:
+            raise HTTPException(status_code=404, detail="PO not found")
+        return po_response_data(po)
+    
+    settings = await settings_cache.get() or {}
+    editor_settings = {field: settings.get(field) for field in EDITOR_SETTINGS_FIELDS}
+    if editor_settings['default_unit_price'] is None:
+        editor_settings['default_unit_price'] = 0.0
+    editor_settings['lazy_numbering'] = bool(editor_settings['lazy_numbering'])
+    
+    async def next_number():
+        if po_id or not doc_type or editor_settings['lazy_numbering']:
+            return None
+        return await allocate_number(doc_type)
+    
+    buyers, billto, po, number = await asyncio.gather(
+        directory_caches["buyers"].get(),
+        directory_caches["billto"].get(),
+        load_po(),
+        next_number()
+    )
+    
+    # Splice the cached directory bodies in as-is rather than re-encoding them
+    rest = json.dumps({"settings": editor_settings, "po": po, "next_number": number}, ensure_ascii=False)
+    body = b''.join([
+        b'{"buyers":', buyers[0],
+        b',"billto":', billto[0],
+        b',', rest[1:].encode('utf-8')
+    ])
+    return Response(content=body, media_type="application/json", headers={"Cache-Control": "no-store"})
+
+
+def directory_update_fields(update: Dict[str, Any]) -> Dict[str, Any]:
+    """PATCH body with the typeahead keys recomputed for changed fields"""
+    update = {k: v for k, v in update.items() if k not in DIRECTORY_KEY_FIELDS}
+    if 'company_name' in update:
+        update['name_key'] = directory_name_key(update['company_name'])
+    if 'gstin' in update:
+        update['gstin_key'] = directory_gstin_key(update['gstin'])
+    return update
+
+
+async def suggest_directory(collection_name: str, q: str, limit: int) -> List[Dict[str, Any]]:
+    """Entries whose normalized company name or GSTIN starts with q.
+
+    Both keys are stored normalized, so an anchored, case-sensitive regex
+    on each is an index range scan rather than a collection scan.
+    """
+    if limit < 1 or limit > SUGGEST_MAX_LIMIT:
+        raise HTTPException(status_code=422, detail=f"limit must be between 1 and {SUGGEST_MAX_LIMIT}")
+    
+    clauses = []
+    name_prefix = directory_name_key(q)
+    if name_prefix:
+        clauses.append({"name_key": {"$regex": f"^{re.escape(name_prefix)}"}})
+    gstin_prefix = directory_gstin_key(q)
+    if gstin_prefix:
+        clauses.append({"gstin_key": {"$regex": f"^{re.escape(gstin_prefix)}"}})
+    
+    if not clauses:
+        query = {}
+    elif len(clauses) == 1:
+        query = clauses[0]
+    else:
+        query = {"$or": clauses}
+    
+    cursor = db[collection_name].find(query, SUGGEST_PROJECTION).sort("name_key", ASCENDING).limit(limit)
+    return await cursor.to_list(length=limit)
+
+
 # Buyer CRUD endpoints
 @api_router.get("/buyers")
-async def get_buyers():
+async def get_buyers(request: Request):
     """Get all buyers"""
-    buyers = await db.buyers.find().to_list(length=None)
-    for buyer in buyers:
-        buyer['_id'] = str(buyer['_id'])
-    return buyers
+    return await directory_response(request, "buyers")
 
 @api_router.post("/buyers")
 async def create_buyer(buyer: Buyer):
@@ -730,14 +2297,20 @@ async def create_buyer(buyer: Buyer):
             {"$set": {"is_default_buyer": False}}
         )
     
-    result = await db.buyers.insert_one(buyer_dict)
+    result = await db.buyers.insert_one(with_directory_keys(dict(buyer_dict)))
+    await directory_caches["buyers"].invalidate()
     buyer_dict['_id'] = str(result.inserted_id)
     return buyer_dict
 
+@api_router.get("/buyers/suggest")
+async def suggest_buyers(q: str = "", limit: int = SUGGEST_DEFAULT_LIMIT):
+    """Typeahead: buyers matching a company name or GSTIN prefix"""
+    return await suggest_directory("buyers", q, limit)
+
 @api_router.get("/buyers/{buyer_id}")
 async def get_buyer(buyer_id: str):
     """Get a specific buyer"""
-    buyer = await db.buyers.find_one({"id": buyer_id})
+    buyer = await db.buyers.find_one({"id": buyer_id}, DIRECTORY_PUBLIC_PROJECTION)
     if not buyer:
         raise HTTPException(status_code=404, detail="Buyer not found")
     buyer['_id'] = str(buyer['_id'])
@@ -753,10 +2326,12 @@ async def update_buyer(buyer_id: str, buyer_update: Dict[str, Any]):
             {"$set": {"is_default_buyer": False}}
         )
     
+    buyer_update = directory_update_fields(buyer_update)
     result = await db.buyers.update_one(
         {"id": buyer_id},
         {"$set": buyer_update}
     )
+    await directory_caches["buyers"].invalidate()
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Buyer not found")
@@ -767,6 +2342,7 @@ async def update_buyer(buyer_id: str, buyer_update: Dict[str, Any]):
 async def delete_buyer(buyer_id: str):
     """Delete a buyer"""
     result = await db.buyers.delete_one({"id": buyer_id})
+    await directory_caches["buyers"].invalidate()
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Buyer not found")
     return {"message": "Buyer deleted successfully"}
@@ -774,25 +2350,28 @@ async def delete_buyer(buyer_id: str):
 
 # Supplier CRUD endpoints
 @api_router.get("/suppliers")
-async def get_suppliers():
+async def get_suppliers(request: Request):
     """Get all suppliers"""
-    suppliers = await db.suppliers.find().to_list(length=None)
-    for supplier in suppliers:
-        supplier['_id'] = str(supplier['_id'])
-    return suppliers
+    return await directory_response(request, "suppliers")
 
 @api_router.post("/suppliers")
 async def create_supplier(supplier: Supplier):
     """Create a new supplier"""
     supplier_dict = supplier.dict()
-    result = await db.suppliers.insert_one(supplier_dict)
+    result = await db.suppliers.insert_one(with_directory_keys(dict(supplier_dict)))
+    await directory_caches["suppliers"].invalidate()
     supplier_dict['_id'] = str(result.inserted_id)
     return supplier_dict
 
+@api_router.get("/suppliers/suggest")
+async def suggest_suppliers(q: str = "", limit: int = SUGGEST_DEFAULT_LIMIT):
+    """Typeahead: suppliers matching a company name or GSTIN prefix"""
+    return await suggest_directory("suppliers", q, limit)
+
 @api_router.get("/suppliers/{supplier_id}")
 async def get_supplier(supplier_id: str):
     """Get a specific supplier"""
-    supplier = await db.suppliers.find_one({"id": supplier_id})
+    supplier = await db.suppliers.find_one({"id": supplier_id}, DIRECTORY_PUBLIC_PROJECTION)
     if not supplier:
         raise HTTPException(status_code=404, detail="Supplier not found")
     supplier['_id'] = str(supplier['_id'])
@@ -801,10 +2380,12 @@ async def get_supplier(supplier_id: str):
 @api_router.patch("/suppliers/{supplier_id}")
 async def update_supplier(supplier_id: str, supplier_update: Dict[str, Any]):
     """Update a supplier"""
+    supplier_update = directory_update_fields(supplier_update)
     result = await db.suppliers.update_one(
         {"id": supplier_id},
         {"$set": supplier_update}
     )
+    await directory_caches["suppliers"].invalidate()
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Supplier not found")
@@ -815,6 +2396,7 @@ async def update_supplier(supplier_id: str, supplier_update: Dict[str, Any]):
 async def delete_supplier(supplier_id: str):
     """Delete a supplier"""
     result = await db.suppliers.delete_one({"id": supplier_id})
+    await directory_caches["suppliers"].invalidate()
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Supplier not found")
     return {"message": "Supplier deleted successfully"}
@@ -822,25 +2404,28 @@ async def delete_supplier(supplier_id: str):
 
 # Bill To CRUD endpoints
 @api_router.get("/billto")
-async def get_billto():
+async def get_billto(request: Request):
     """Get all bill-to parties"""
-    billtos = await db.billto.find().to_list(length=None)
-    for billto in billtos:
-        billto['_id'] = str(billto['_id'])
-    return billtos
+    return await directory_response(request, "billto")
 
 @api_router.post("/billto")
 async def create_billto(billto: BillTo):
     """Create a new bill-to party"""
     billto_dict = billto.dict()
-    result = await db.billto.insert_one(billto_dict)
+    result = await db.billto.insert_one(with_directory_keys(dict(billto_dict)))
+    await directory_caches["billto"].invalidate()
     billto_dict['_id'] = str(result.inserted_id)
     return billto_dict
 
+@api_router.get("/billto/suggest")
+async def suggest_billto(q: str = "", limit: int = SUGGEST_DEFAULT_LIMIT):
+    """Typeahead: bill-to parties matching a company name or GSTIN prefix"""
+    return await suggest_directory("billto", q, limit)
+
 @api_router.get("/billto/{billto_id}")
 async def get_billto_by_id(billto_id: str):
     """Get a specific bill-to party"""
-    billto = await db.billto.find_one({"id": billto_id})
+    billto = await db.billto.find_one({"id": billto_id}, DIRECTORY_PUBLIC_PROJECTION)
     if not billto:
         raise HTTPException(status_code=404, detail="Bill-to party not found")
     billto['_id'] = str(billto['_id'])
@@ -849,10 +2434,12 @@ async def get_billto_by_id(billto_id: str):
 @api_router.patch("/billto/{billto_id}")
 async def update_billto(billto_id: str, billto_update: Dict[str, Any]):
     """Update a bill-to party"""
+    billto_update = directory_update_fields(billto_update)
     result = await db.billto.update_one(
         {"id": billto_id},
         {"$set": billto_update}
     )
+    await directory_caches["billto"].invalidate()
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Bill-to party not found")
@@ -863,11 +2450,43 @@ async def update_billto(billto_id: str, billto_update: Dict[str, Any]):
 async def delete_billto(billto_id: str):
     """Delete a bill-to party"""
     result = await db.billto.delete_one({"id": billto_id})
+    await directory_caches["billto"].invalidate()
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Bill-to party not found")
     return {"message": "Bill-to party deleted successfully"}
 
 
+# Reporting endpoints - aggregated in MongoDB from stored PO totals
+
+@api_router.get("/reports")
+async def list_reports():
+    """List the available aggregate reports"""
+    return {"reports": list(REPORT_PIPELINES.keys())}
+
+@api_router.get("/reports/{report_name}")
+async def get_report(
+    report_name: str,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    doc_type: Optional[str] = None
+):
+    """Run an aggregate report, optionally limited to a po_date range (YYYY-MM-DD, inclusive)"""
+    pipeline_builder = REPORT_PIPELINES.get(report_name)
+    if not pipeline_builder:
+        raise HTTPException(status_code=404, detail=f"Unknown report '{report_name}'")
+    
+    validate_date_range(date_from, date_to)
+    
+    pipeline = pipeline_builder(match_stage(date_from, date_to, doc_type))
+    rows = await db.purchase_orders.aggregate(pipeline).to_list(length=None)
+    
+    return {
+        "report": report_name,
+        "filters": {"date_from": date_from, "date_to": date_to, "doc_type": doc_type},
+        "rows": rows
+    }
+
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -886,25 +2505,16 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@app.on_event("startup")
-async def startup_event():
-    logger.info(f"Upload directory: {upload_dir}")
-    logger.info(f"MongoDB URL: {mongo_url}")
-    logger.info(f"Database: {os.environ.get('DB_NAME', 'po_generator')}")
-    logger.info(f"CORS Origins: {os.environ.get('CORS_ORIGINS', '*')}")
-    
-    # Seed default settings if missing
+async def seed_default_settings():
+    """Create the settings document, or add fields introduced since it was written"""
     settings = await db.settings.find_one({"_id": "app_settings"})
     if not settings:
         default_settings = {
             "_id": "app_settings",
-            "next_po_number": 1,
             "po_prefix": "NA/",
             "use_po_prefix": False,
-            "next_pi_number": 1,
             "pi_prefix": "PI/",
             "use_pi_prefix": False,
-            "logo_base64": None,
             "logo_filename": None,
             "updated_at": datetime.now(timezone.utc).isoformat()
         }
@@ -913,14 +2523,10 @@ async def startup_event():
     else:
         # Update existing settings to add new fields if missing
         update_fields = {}
-        if 'next_po_number' not in settings:
-            update_fields['next_po_number'] = 1
         if 'po_prefix' not in settings:
             update_fields['po_prefix'] = "NA/"
         if 'use_po_prefix' not in settings:
             update_fields['use_po_prefix'] = False
-        if 'next_pi_number' not in settings:
-            update_fields['next_pi_number'] = 1
         if 'pi_prefix' not in settings:
             update_fields['pi_prefix'] = "PI/"
         if 'use_pi_prefix' not in settings:
@@ -932,16 +2538,9 @@ async def startup_event():
                 {"$set": update_fields}
             )
             logger.info(f"✅ Updated settings with new fields: {list(update_fields.keys())}")
-    
-    # Migrate existing POs to have doc_type field
-    result = await db.pos.update_many(
-        {"doc_type": {"$exists": False}},
-        {"$set": {"doc_type": "PO"}}
-    )
-    if result.modified_count > 0:
-        logger.info(f"✅ Migrated {result.modified_count} existing documents to doc_type: PO")
-    
-    # Seed default Newline Apparel buyer if no buyers exist
+
+async def seed_default_buyer():
+    """Seed the default Newline Apparel buyer if no buyers exist"""
     buyer_count = await db.buyers.count_documents({})
     if buyer_count == 0:
         default_buyer = {
@@ -958,9 +2557,123 @@ async def startup_event():
             "is_default_buyer": True,
             "created_at": datetime.now(timezone.utc).isoformat()
         }
-        await db.buyers.insert_one(default_buyer)
+        await db.buyers.insert_one(with_directory_keys(default_buyer))
+        await directory_caches["buyers"].invalidate()
         logger.info("✅ Seeded default buyer: Newline Apparel")
 
-@app.on_event("shutdown")
+@contextmanager
+def bootstrap_step(name: str, failed_steps: List[str]):
+    """Log a failing optional bootstrap step and move on to the next one"""
+    try:
+        yield
+    except Exception as e:
+        logger.exception(f"❌ Bootstrap step {name!r} failed: {str(e)}")
+        failed_steps.append(name)
+
+async def run_bootstrap() -> List[str]:
+    """One-off database setup: indexes, seed data, backfills and migrations.
+    
+    Run once per deploy through `python migrate.py bootstrap` (which holds
+    the bootstrap lock), not on every worker start. Every step is idempotent.
+    Only the indexes are required; the web workers start right after this
+    runs, so any other step that fails is logged and skipped, and the names
+    of those steps are returned and recorded for the next run to retry.
+    """
+    # Every lookup filters on the string `id`, so make sure it is indexed
+    await ensure_indexes()
+    
+    failed_steps: List[str] = []
+    with bootstrap_step("migrate_logo_base64", failed_steps):
+        if await migrate_logo_base64():
+            logger.info("✅ Moved settings.logo_base64 into GridFS-backed logo storage")
+    with bootstrap_step("backfill_logo_variants", failed_steps):
+        if await backfill_logo_variants():
+            logger.info("✅ Generated print/screen logo variants")
+    with bootstrap_step("cleanup_orphaned_uploads", failed_steps):
+        orphans = await cleanup_orphaned_uploads()
+        if orphans:
+            logger.info(f"✅ Removed {len(orphans)} orphaned upload files")
+    
+    with bootstrap_step("backfill_po_totals", failed_steps):
+        totals_backfilled = await backfill_po_totals()
+        if totals_backfilled:
+            logger.info(f"✅ Computed stored totals for {totals_backfilled} documents")
+    
+    with bootstrap_step("backfill_search_keys", failed_steps):
+        backfilled = await backfill_search_keys()
+        if backfilled:
+            logger.info(f"✅ Backfilled search keys on {backfilled} documents")
+    
+    with bootstrap_step("backfill_directory_keys", failed_steps):
+        directory_backfilled = await backfill_directory_keys()
+        if directory_backfilled:
+            logger.info(f"✅ Backfilled typeahead keys on {directory_backfilled} directory entries")
+    
+    with bootstrap_step("seed_default_settings", failed_steps):
+        await seed_default_settings()
+    
+    with bootstrap_step("migrate_legacy_counters", failed_steps):
+        if await migrate_legacy_counters():
+            logger.info("✅ Moved PO/PI counters from settings into the counters collection")
+    
+    # Legacy documents (missing doc_type, string colours, ...) are rewritten
+    # by the offline migration rather than converted on every request
+    with bootstrap_step("check_legacy_pos", failed_steps):
+        legacy_po = await db.purchase_orders.find_one(
+            {"schema_version": {"$ne": PO_SCHEMA_VERSION}},
+            {"_id": 1}
+        )
+        if legacy_po:
+            logger.warning("⚠️ Some POs predate the canonical schema; run `python migrate.py canonicalize-pos`")
+    
+    with bootstrap_step("seed_default_buyer", failed_steps):
+        await seed_default_buyer()
+    
+    await db.migrations.update_one(
+        {"_id": BOOTSTRAP_STATE_ID},
+        {"$set": {
+            "version": BOOTSTRAP_VERSION,
+            "failed_steps": failed_steps,
+            "completed_at": datetime.now(timezone.utc).isoformat()
+        }},
+        upsert=True
+    )
+    # Settings may have changed under the cache
+    settings_cache.invalidate()
+    return failed_steps
+
+async def bootstrap_version() -> Optional[int]:
+    """Version of the last completed bootstrap, None if it never ran"""
+    state = await db.migrations.find_one({"_id": BOOTSTRAP_STATE_ID}, {"version": 1})
+    return (state or {}).get('version')
+
+async def warm_up_pool():
+    """Open minPoolSize connections up front so the first requests don't pay for them"""
+    size = MONGO_POOL_OPTIONS['minPoolSize']
+    if size <= 0:
+        return
+    try:
+        # Concurrent commands each check out their own connection
+        await asyncio.gather(*(client.admin.command("ping") for _ in range(size)))
+        logger.info(f"✅ Warmed MongoDB pool with {size} connections")
+    except Exception as e:
+        # Not fatal: the pool fills on demand and /api/health/ready reports the outage
+        logger.warning(f"⚠️ MongoDB pool warm-up failed: {str(e)}")
+
+async def startup_event():
+    logger.info(f"Upload directory: {upload_dir}")
+    logger.info(f"MongoDB URL: {mongo_url}")
+    logger.info(f"Database: {os.environ.get('DB_NAME', 'po_generator')}")
+    logger.info(f"CORS Origins: {os.environ.get('CORS_ORIGINS', '*')}")
+    logger.info(f"MongoDB pool: {MONGO_POOL_OPTIONS}")
+    
+    # Seeding and migrations run out of band (`python migrate.py bootstrap`);
+    # a worker only connects and starts its caches
+    await warm_up_pool()
+    settings_cache.start()
+
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    await settings_cache.stop()
+    client.close()
+    if pdf_executor is not None:
+        pdf_executor.shutdown(wait=False, cancel_futures=True)
\ No newline at end of file
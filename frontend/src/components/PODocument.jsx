@@ -30,8 +30,13 @@ export const PODocument = React.forwardRef(({ data }, ref) => {
   const fetchLogo = async () => {
     try {
       const response = await axios.get(`${API}/settings/logo`);
-      if (response.data.logo_base64) {
-        setSettingsLogo(response.data.logo_base64);
+      if (response.data.logo_url) {
+        // Prefer the downscaled print variants over the original upload
+        const variants = response.data.logo_variants || {};
+        setSettingsLogo({
+          src: `${BACKEND_URL}${variants.print || response.data.logo_url}`,
+          webp: variants.print_webp ? `${BACKEND_URL}${variants.print_webp}` : null
+        });
       }
     } catch (error) {
       console.error('Error fetching logo:', error);
@@ -67,17 +72,20 @@ export const PODocument = React.forwardRef(({ data }, ref) => {
                 </div>
                 <div className="flex items-center">
                   {settingsLogo ? (
-                    <img 
-                      src={settingsLogo} 
-                      alt="Company Logo" 
-                      style={{ 
-                        maxHeight: '38pt', 
-                        maxWidth: '120pt', 
-                        width: 'auto',
-                        height: 'auto',
-                        objectFit: 'contain' 
-                      }} 
-                    />
+                    <picture>
+                      {settingsLogo.webp && <source srcSet={settingsLogo.webp} type="image/webp" />}
+                      <img 
+                        src={settingsLogo.src} 
+                        alt="Company Logo" 
+                        style={{ 
+                          maxHeight: '38pt', 
+                          maxWidth: '120pt', 
+                          width: 'auto',
+                          height: 'auto',
+                          objectFit: 'contain' 
+                        }} 
+                      />
+                    </picture>
                   ) : (
                     <div style={{ 
                       height: '38pt', 
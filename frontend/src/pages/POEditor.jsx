@@ -19,20 +19,72 @@ import { formatINR } from '../utils/formatters';
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+const escapePointer = (segment) => String(segment).replace(/~/g, '~0').replace(/\//g, '~1');
+const colorKey = (color) => (typeof color === 'string' ? color : color.name);
+// Pointer segments become dotted MongoDB paths on the server, which
+// rejects keys containing '.' or starting with '$' (e.g. "Grey Mel.", "2.5")
+const isPatchableKey = (key) => {
+  const text = String(key);
+  return text !== '' && !text.includes('.') && !text.startsWith('$');
+};
+
+// JSON-Patch operations turning the last saved payload into the current
+// one, or null when something beyond matrix cells and order line edits or
+// additions changed and a full PUT is needed
+const buildPatchOperations = (before, after) => {
+  const { size_colour_breakdown: beforeMatrix, order_lines: beforeLines, ...beforeRest } = before;
+  const { size_colour_breakdown: afterMatrix, order_lines: afterLines, ...afterRest } = after;
+  if (JSON.stringify(beforeRest) !== JSON.stringify(afterRest)) return null;
+  if (JSON.stringify(beforeMatrix.sizes) !== JSON.stringify(afterMatrix.sizes)) return null;
+  if (JSON.stringify(beforeMatrix.colors) !== JSON.stringify(afterMatrix.colors)) return null;
+  if (afterLines.length < beforeLines.length) return null;
+
+  const operations = [];
+  for (const color of afterMatrix.colors.map(colorKey)) {
+    for (const size of afterMatrix.sizes) {
+      const previous = Number(beforeMatrix.values?.[color]?.[size]) || 0;
+      const current = Number(afterMatrix.values?.[color]?.[size]) || 0;
+      if (previous !== current) {
+        if (!isPatchableKey(color) || !isPatchableKey(size)) return null;
+        operations.push({
+          op: 'replace',
+          path: `/size_colour_breakdown/values/${escapePointer(color)}/${escapePointer(size)}`,
+          value: current
+        });
+      }
+    }
+  }
+  afterLines.forEach((line, index) => {
+    if (index >= beforeLines.length) {
+      operations.push({ op: 'add', path: '/order_lines/-', value: line });
+    } else if (JSON.stringify(line) !== JSON.stringify(beforeLines[index])) {
+      operations.push({ op: 'replace', path: `/order_lines/${index}`, value: line });
+    }
+  });
+  return operations;
+};
+
 export default function POEditor() {
   const navigate = useNavigate();
   const { id } = useParams();
   const location = window.location;
   const isNew = location.pathname === '/po/new';
   const printRef = useRef();
+  // Payload of the last successful save; later saves send only what changed
+  const lastSavedRef = useRef(null);
   const [loading, setLoading] = useState(false);
   const [openPreview, setOpenPreview] = useState(false);
   const [docType, setDocType] = useState('PO'); // 'PO' or 'PI'
   const [defaultUnitPrice, setDefaultUnitPrice] = useState(0);
+  const [lazyNumbering, setLazyNumbering] = useState(false);
+  // Server revision of the loaded document, sent back on save to detect conflicts
+  const [revision, setRevision] = useState(0);
 
   // Directory lists for dropdowns
   const [buyers, setBuyers] = useState([]);
-  const [suppliers, setSuppliers] = useState([]);
+  const [supplierQuery, setSupplierQuery] = useState('');
+  const [supplierSuggestions, setSupplierSuggestions] = useState([]);
+  const [showSupplierSuggestions, setShowSupplierSuggestions] = useState(false);
   const [billToParties, setBillToParties] = useState([]);
 
   // Form state
@@ -128,59 +180,44 @@ export default function POEditor() {
   });
 
   useEffect(() => {
-    // Fetch directories and settings on mount
-    fetchDirectories();
-    fetchSettings();
-    
-    if (id && !isNew) {
-      // Editing existing PO/PI
-      fetchPO();
-    } else if (isNew && !poNumber) {
-      // Creating new PO/PI - fetch next number ONLY if empty
-      fetchNextPoNumber();
-    }
+    fetchEditorData();
   }, [id, isNew]);
   
   // DO NOT re-fetch number when docType changes
   // User can manually edit the number if they want to change format
 
-  const fetchNextPoNumber = async () => {
-    try {
-      const endpoint = docType === 'PI' ? '/pi/next-number' : '/po/next-number';
-      console.log(`Fetching next ${docType} number...`);
-      const response = await axios.post(`${API}${endpoint}`);
-      console.log(`Next ${docType} number response:`, response.data);
-      setPoNumber(response.data.number);
-      console.log(`${docType} number set to:`, response.data.number);
-    } catch (error) {
-      console.error(`Error fetching next ${docType} number:`, error);
-      // Don't show error toast, just log it - user can manually enter
-    }
-  };
-
-  const fetchDirectories = async () => {
-    try {
-      const [buyersRes, suppliersRes, billToRes] = await Promise.all([
-        axios.get(`${API}/buyers`),
-        axios.get(`${API}/suppliers`),
-        axios.get(`${API}/billto`)
-      ]);
-      setBuyers(buyersRes.data);
-      setSuppliers(suppliersRes.data);
-      setBillToParties(billToRes.data);
-    } catch (error) {
-      console.error('Error fetching directories:', error);
+  // Directories, settings and the PO (when editing) or the next number
+  // (when creating) all come back from a single bootstrap request
+  const fetchEditorData = async () => {
+    const editing = id && !isNew;
+    const params = {};
+    if (editing) {
+      params.po_id = id;
+    } else if (isNew && !poNumber) {
+      // Creating new PO/PI - fetch next number ONLY if empty
+      params.doc_type = docType;
     }
-  };
-
-  const fetchSettings = async () => {
+    
     try {
-      const response = await axios.get(`${API}/settings`);
-      if (response.data) {
-        setDefaultUnitPrice(response.data.default_unit_price || 0);
+      if (editing) setLoading(true);
+      const response = await axios.post(`${API}/editor/bootstrap`, null, { params });
+      const data = response.data;
+      
+      setBuyers(data.buyers);
+      setBillToParties(data.billto);
+      setDefaultUnitPrice(data.settings?.default_unit_price || 0);
+      setLazyNumbering(Boolean(data.settings?.lazy_numbering));
+      
+      if (data.po) {
+        applyPO(data.po);
+      } else if (data.next_number) {
+        setPoNumber(data.next_number.number);
       }
     } catch (error) {
-      console.error('Error fetching settings:', error);
+      console.error('Error loading editor data:', error);
+      if (editing) toast.error('Failed to load PO');
+    } finally {
+      if (editing) setLoading(false);
     }
   };
 
@@ -212,9 +249,29 @@ export default function POEditor() {
     }
   };
 
-  const handleSelectSupplier = (supplierId) => {
-    const selected = suppliers.find(s => s.id === supplierId);
-    if (selected) {
+  // Supplier directories can be large, so the picker asks the server for
+  // a handful of prefix matches instead of loading every supplier
+  useEffect(() => {
+    if (!showSupplierSuggestions) return;
+    const timer = setTimeout(async () => {
+      try {
+        const response = await axios.get(`${API}/suppliers/suggest`, {
+          params: { q: supplierQuery, limit: 10 }
+        });
+        setSupplierSuggestions(response.data);
+      } catch (error) {
+        console.error('Error fetching supplier suggestions:', error);
+      }
+    }, 200);
+    return () => clearTimeout(timer);
+  }, [supplierQuery, showSupplierSuggestions]);
+
+  const handleSelectSupplier = async (supplierId) => {
+    setShowSupplierSuggestions(false);
+    setSupplierQuery('');
+    try {
+      const response = await axios.get(`${API}/suppliers/${supplierId}`);
+      const selected = response.data;
       setSupplier({
         company: selected.company_name,
         address_lines: [selected.address1, selected.address2, selected.address3].filter(Boolean),
@@ -223,88 +280,82 @@ export default function POEditor() {
         phone: selected.phone || '',
         email: selected.email || ''
       });
+    } catch (error) {
+      console.error('Error fetching supplier:', error);
+      toast.error('Failed to load supplier');
     }
   };
 
-  const fetchPO = async () => {
-    try {
-      setLoading(true);
-      const response = await axios.get(`${API}/pos/${id}`);
-      const po = response.data;
-      
-      // Set document type (default to PO for backward compatibility)
-      setDocType(po.doc_type || 'PO');
-      
-      setPoNumber(po.po_number);
-      setPoDate(po.po_date);
-      setDeliveryDate(po.delivery_date);
-      setDeliveryTerms(po.delivery_terms);
-      setPaymentTerms(po.payment_terms);
-      setCurrency(po.currency);
-      
-      // Handle bill_to with fallback for old POs
-      setBillTo(po.bill_to || {
-        company: '',
-        address_lines: ['', '', ''],
-        gstin: '',
-        contact_name: '',
-        phone: '',
-        email: ''
-      });
-      
-      // Handle buyer with fallback
-      setBuyer(po.buyer || {
-        company: 'Newline Apparel',
-        address_lines: ['61, GKD Nagar, PN Palayam', 'Coimbatore – 641037', 'Tamil Nadu'],
-        gstin: '33AABCN1234F1Z5',
-        contact_name: '',
-        phone: '',
-        email: ''
-      });
-      
-      // Handle supplier with fallback
-      setSupplier(po.supplier || {
-        company: '',
-        address_lines: ['', '', ''],
-        gstin: '',
-        contact_name: '',
-        phone: '',
-        email: ''
-      });
-      
-      setOrderLines(po.order_lines);
-      
-      // Handle matrix with grandTotal calculation
-      const matrixData = po.size_colour_breakdown;
-      if (matrixData && !matrixData.grandTotal) {
-        // Calculate grandTotal if not present
-        const grandTotal = (matrixData.colors || []).reduce((acc, color) => {
-          return acc + (matrixData.sizes || []).reduce((sum, size) => {
-            return sum + (Number(matrixData.values?.[color]?.[size]) || 0);
-          }, 0);
+  const applyPO = (po) => {
+    // Set document type (default to PO for backward compatibility)
+    setDocType(po.doc_type || 'PO');
+    setRevision(po.revision || 0);
+    lastSavedRef.current = null;
+    
+    setPoNumber(po.po_number);
+    setPoDate(po.po_date);
+    setDeliveryDate(po.delivery_date);
+    setDeliveryTerms(po.delivery_terms);
+    setPaymentTerms(po.payment_terms);
+    setCurrency(po.currency);
+    
+    // Handle bill_to with fallback for old POs
+    setBillTo(po.bill_to || {
+      company: '',
+      address_lines: ['', '', ''],
+      gstin: '',
+      contact_name: '',
+      phone: '',
+      email: ''
+    });
+    
+    // Handle buyer with fallback
+    setBuyer(po.buyer || {
+      company: 'Newline Apparel',
+      address_lines: ['61, GKD Nagar, PN Palayam', 'Coimbatore – 641037', 'Tamil Nadu'],
+      gstin: '33AABCN1234F1Z5',
+      contact_name: '',
+      phone: '',
+      email: ''
+    });
+    
+    // Handle supplier with fallback
+    setSupplier(po.supplier || {
+      company: '',
+      address_lines: ['', '', ''],
+      gstin: '',
+      contact_name: '',
+      phone: '',
+      email: ''
+    });
+    
+    setOrderLines(po.order_lines);
+    
+    // Handle matrix with grandTotal calculation
+    const matrixData = po.size_colour_breakdown;
+    if (matrixData && !matrixData.grandTotal) {
+      // Calculate grandTotal if not present
+      const grandTotal = (matrixData.colors || []).reduce((acc, color) => {
+        return acc + (matrixData.sizes || []).reduce((sum, size) => {
+          return sum + (Number(matrixData.values?.[color]?.[size]) || 0);
         }, 0);
-        matrixData.grandTotal = grandTotal;
-      }
-      setMatrix(matrixData || {
-        sizes: ['S', 'M', 'L', 'XL', 'XXL', 'XXXL'],
-        colors: ['Black', 'Grey Melange', 'Charcoal Melange'],
-        values: {},
-        grandTotal: 0
-      });
-      
-      setPacking(po.packing_instructions);
-      setTerms(po.other_terms);
-      setAuthorisation(po.authorisation);
-      
-      // Load tax details if available (for PI)
-      if (po.tax_details) {
-        setTaxDetails(po.tax_details);
-      }
-    } catch (error) {
-      console.error('Error fetching PO:', error);
-      toast.error('Failed to load PO');
-    } finally {
-      setLoading(false);
+      }, 0);
+      matrixData.grandTotal = grandTotal;
+    }
+    setMatrix(matrixData || {
+      sizes: ['S', 'M', 'L', 'XL', 'XXL', 'XXXL'],
+      colors: ['Black', 'Grey Melange', 'Charcoal Melange'],
+      values: {},
+      grandTotal: 0
+    });
+    
+    setPacking(po.packing_instructions);
+    setTerms(po.other_terms);
+    setAuthorisation(po.authorisation);
+    
+    // Load tax details if available (for PI)
+    if (po.tax_details) {
+      setTaxDetails(po.tax_details);
     }
   };
 
@@ -322,8 +373,9 @@ export default function POEditor() {
   };
 
   const handleSave = async () => {
-    // Validation
-    if (!poNumber.trim()) {
+    // Validation - with lazy numbering a new document may leave the number
+    // blank and the server assigns one on save
+    if (!poNumber.trim() && !(lazyNumbering && isNew)) {
       toast.error('PO Number is required');
       return;
     }
@@ -392,7 +444,21 @@ export default function POEditor() {
       };
 
       if (id && id !== 'new') {
-        await axios.put(`${API}/pos/${id}`, poData);
+        const operations = lastSavedRef.current && buildPatchOperations(lastSavedRef.current, poData);
+        let response = null;
+        if (operations && operations.length > 0) {
+          try {
+            response = await axios.patch(`${API}/pos/${id}`, { revision, operations });
+          } catch (error) {
+            // A patch the server can't apply is still saved, as a full PUT
+            if (error.response?.status !== 422) throw error;
+          }
+        }
+        if (!response) {
+          response = await axios.put(`${API}/pos/${id}`, { ...poData, revision });
+        }
+        setRevision(response.data.revision);
+        lastSavedRef.current = poData;
         toast.success('PO updated successfully');
       } else {
         const response = await axios.post(`${API}/pos`, poData);
@@ -401,7 +467,8 @@ export default function POEditor() {
       }
     } catch (error) {
       console.error('Error saving PO:', error);
-      const errorMessage = error.response?.data?.detail || error.message || 'Failed to save PO';
+      const detail = error.response?.data?.detail;
+      const errorMessage = (typeof detail === 'string' ? detail : detail?.message) || error.message || 'Failed to save PO';
       toast.error(errorMessage);
     } finally {
       setLoading(false);
@@ -734,7 +801,11 @@ export default function POEditor() {
                     id="po-number"
                     value={poNumber}
                     onChange={(e) => setPoNumber(e.target.value)}
-                    placeholder={docType === 'PI' ? "PI/011125/0001" : "NA/011125/0001"}
+                    placeholder={
+                      lazyNumbering && isNew
+                        ? 'Assigned on save'
+                        : docType === 'PI' ? "PI/011125/0001" : "NA/011125/0001"
+                    }
                     data-testid="po-form-po-number-input"
                   />
                 </div>
@@ -977,19 +1048,35 @@ export default function POEditor() {
               <div className="space-y-4">
                 {/* Select from Directory */}
                 <div>
-                  <Label>Select from Directory</Label>
-                  <Select onValueChange={handleSelectSupplier}>
-                    <SelectTrigger>
-                      <SelectValue placeholder="Choose a supplier..." />
-                    </SelectTrigger>
-                    <SelectContent>
-                      {suppliers.map(supp => (
-                        <SelectItem key={supp.id} value={supp.id}>
-                          {supp.company_name}
-                        </SelectItem>
-                      ))}
-                    </SelectContent>
-                  </Select>
+                  <Label htmlFor="supplier-search">Select from Directory</Label>
+                  <div className="relative">
+                    <Input
+                      id="supplier-search"
+                      value={supplierQuery}
+                      onChange={(e) => setSupplierQuery(e.target.value)}
+                      onFocus={() => setShowSupplierSuggestions(true)}
+                      onBlur={() => setTimeout(() => setShowSupplierSuggestions(false), 150)}
+                      placeholder="Search suppliers by name or GSTIN..."
+                      autoComplete="off"
+                      data-testid="po-form-supplier-search"
+                    />
+                    {showSupplierSuggestions && supplierSuggestions.length > 0 && (
+                      <div className="absolute z-10 mt-1 w-full rounded-md border bg-white shadow-md max-h-64 overflow-y-auto">
+                        {supplierSuggestions.map(supp => (
+                          <button
+                            key={supp.id}
+                            type="button"
+                            className="w-full px-3 py-2 text-left text-sm hover:bg-neutral-50"
+                            onMouseDown={(e) => e.preventDefault()}
+                            onClick={() => handleSelectSupplier(supp.id)}
+                          >
+                            <div>{supp.company_name}</div>
+                            {supp.gstin && <div className="text-xs text-neutral-500">{supp.gstin}</div>}
+                          </button>
+                        ))}
+                      </div>
+                    )}
+                  </div>
                 </div>
                 <Separator />
                 <div>
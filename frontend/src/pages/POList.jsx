@@ -15,7 +15,9 @@ const API = `${BACKEND_URL}/api`;
 export default function POList() {
   const navigate = useNavigate();
   const [pos, setPos] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [searchTerm, setSearchTerm] = useState('');
   const [supplierFilter, setSupplierFilter] = useState('');
 
@@ -23,15 +25,22 @@ export default function POList() {
     fetchPOs();
   }, []);
 
+  const buildParams = (cursor) => {
+    const params = {};
+    if (searchTerm) params.search = searchTerm;
+    if (supplierFilter) params.supplier = supplierFilter;
+    if (cursor) params.cursor = cursor;
+    return params;
+  };
+
   const fetchPOs = async () => {
     try {
       setLoading(true);
-      const params = {};
-      if (searchTerm) params.search = searchTerm;
-      if (supplierFilter) params.supplier = supplierFilter;
-      
-      const response = await axios.get(`${API}/pos`, { params });
-      setPos(response.data);
+      // Search and supplier filter are index-backed on /pos/summary and keep
+      // keyset pagination; /pos/search is a single ranked page for typeahead
+      const response = await axios.get(`${API}/pos/summary`, { params: buildParams() });
+      setPos(response.data.items);
+      setNextCursor(response.data.next_cursor);
     } catch (error) {
       console.error('Error fetching POs:', error);
       toast.error('Failed to load purchase orders');
@@ -40,6 +49,21 @@ export default function POList() {
     }
   };
 
+  const handleLoadMore = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const response = await axios.get(`${API}/pos/summary`, { params: buildParams(nextCursor) });
+      setPos((prev) => [...prev, ...response.data.items]);
+      setNextCursor(response.data.next_cursor);
+    } catch (error) {
+      console.error('Error fetching more POs:', error);
+      toast.error('Failed to load more purchase orders');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleSearch = () => {
     fetchPOs();
   };
@@ -177,7 +201,7 @@ export default function POList() {
                       >
                         <TableCell className="font-medium">{po.po_number}</TableCell>
                         <TableCell>{formatDate(po.po_date)}</TableCell>
-                        <TableCell>{po.supplier?.company || 'N/A'}</TableCell>
+                        <TableCell>{po.supplier_company || 'N/A'}</TableCell>
                         <TableCell>{formatDate(po.delivery_date)}</TableCell>
                         <TableCell className="text-right">
                           <div className="flex gap-2 justify-end">
@@ -214,6 +238,18 @@ export default function POList() {
                     ))}
                   </TableBody>
                 </Table>
+                {nextCursor && (
+                  <div className="flex justify-center py-4 border-t">
+                    <Button
+                      variant="secondary"
+                      onClick={handleLoadMore}
+                      disabled={loadingMore}
+                      data-testid="po-list-load-more-button"
+                    >
+                      {loadingMore ? 'Loading...' : 'Load More'}
+                    </Button>
+                  </div>
+                )}
               </div>
             )}
           </CardContent>
@@ -29,8 +29,8 @@ export default function Settings() {
     try {
       const response = await axios.get(`${API}/settings`);
       if (response.data) {
-        if (response.data.logo_base64) {
-          setLogo(response.data.logo_base64);
+        if (response.data.logo_url) {
+          setLogo(`${BACKEND_URL}${response.data.logo_variants?.screen || response.data.logo_url}`);
           setLogoFilename(response.data.logo_filename);
         }
         setDefaultUnitPrice(response.data.default_unit_price || 0);
@@ -78,7 +78,7 @@ export default function Settings() {
       });
 
       if (response.status === 200 || response.status === 201) {
-        setLogo(response.data.logo_base64);
+        setLogo(`${BACKEND_URL}${response.data.logo_variants?.screen || response.data.logo_url}`);
         setLogoFilename(response.data.filename);
         setSelectedFile(null);
         
@@ -0,0 +1,43 @@
+import os
+import sys
+
+import pytest
+
+# Backend modules import each other top-level (run from backend/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+
+@pytest.fixture
+def mock_db(monkeypatch):
+    """Point server at an empty in-memory database"""
+    import mongomock.collection
+    from mongomock_motor import AsyncMongoMockClient
+    import server
+
+    # mongomock re-reads the returned document with the caller's filter
+    # whenever the projection drops _id, so a filter on a field the update
+    # changes (revision) finds nothing; pin the match to its _id first
+    find_and_modify = mongomock.collection.Collection._find_and_modify
+
+    def pinned_find_and_modify(self, query, projection=None, *args, **kwargs):
+        match = self.find_one(query, {"_id": 1}, sort=kwargs.get("sort"))
+        if match:
+            query = {"_id": match["_id"]}
+        return find_and_modify(self, query, projection, *args, **kwargs)
+
+    monkeypatch.setattr(mongomock.collection.Collection, "_find_and_modify", pinned_find_and_modify)
+    db = AsyncMongoMockClient()['test']
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server.number_allocator, "collection", db.counters)
+    server.settings_cache.invalidate()
+    yield db
+    server.settings_cache.invalidate()
+
+
+@pytest.fixture
+def api(mock_db):
+    """TestClient over mock_db; no lifespan, so nothing connects to MongoDB"""
+    from fastapi.testclient import TestClient
+    import server
+
+    return TestClient(server.app)
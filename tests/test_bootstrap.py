@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+import migrate
+import server
+
+
+async def no_orphans():
+    # The real step scans the upload directory on disk
+    return []
+
+
+async def broken_step():
+    raise ValueError("corrupt legacy data")
+
+
+@pytest.fixture
+def bootstrap_db(mock_db, monkeypatch):
+    monkeypatch.setattr(server, "cleanup_orphaned_uploads", no_orphans)
+    return mock_db
+
+
+def marker(db):
+    return asyncio.run(db.migrations.find_one({"_id": server.BOOTSTRAP_STATE_ID}))
+
+
+def test_clean_run_records_version(bootstrap_db):
+    assert asyncio.run(server.run_bootstrap()) == []
+    state = marker(bootstrap_db)
+    assert state["version"] == server.BOOTSTRAP_VERSION
+    assert state["failed_steps"] == []
+    assert asyncio.run(server.bootstrap_version()) == server.BOOTSTRAP_VERSION
+
+
+@pytest.mark.parametrize("step", ["migrate_logo_base64", "backfill_logo_variants", "migrate_legacy_counters", "backfill_search_keys"])
+def test_failing_data_step_is_skipped(bootstrap_db, monkeypatch, step):
+    monkeypatch.setattr(server, step, broken_step)
+
+    assert asyncio.run(server.run_bootstrap()) == [step]
+
+    # Later steps still ran and workers can report ready
+    assert asyncio.run(bootstrap_db.settings.find_one({"_id": "app_settings"})) is not None
+    assert asyncio.run(bootstrap_db.buyers.count_documents({})) == 1
+    state = marker(bootstrap_db)
+    assert state["version"] == server.BOOTSTRAP_VERSION
+    assert state["failed_steps"] == [step]
+
+
+def test_index_failure_is_fatal(bootstrap_db, monkeypatch):
+    monkeypatch.setattr(server, "ensure_indexes", broken_step)
+    with pytest.raises(ValueError):
+        asyncio.run(server.run_bootstrap())
+    assert marker(bootstrap_db) is None
+
+
+def test_failed_steps_are_retried_on_the_next_run(bootstrap_db, monkeypatch):
+    migrate_legacy_counters = server.migrate_legacy_counters
+    monkeypatch.setattr(server, "migrate_legacy_counters", broken_step)
+    assert asyncio.run(migrate.bootstrap()) == ["migrate_legacy_counters"]
+
+    monkeypatch.setattr(server, "migrate_legacy_counters", migrate_legacy_counters)
+    assert asyncio.run(migrate.bootstrap()) == []
+    assert marker(bootstrap_db)["failed_steps"] == []
+
+    assert asyncio.run(migrate.bootstrap()) is None
+    assert asyncio.run(bootstrap_db.locks.count_documents({})) == 0
+
+
+def test_command_exits_zero_when_a_data_step_fails(bootstrap_db, monkeypatch):
+    monkeypatch.setattr(server, "backfill_po_totals", broken_step)
+    assert migrate.main(["bootstrap"]) == 0
+    assert marker(bootstrap_db)["failed_steps"] == ["backfill_po_totals"]
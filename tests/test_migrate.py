@@ -0,0 +1,80 @@
+from datetime import datetime, timezone
+
+import pytest
+from bson import ObjectId
+
+from migrate import canonical_po_document
+from server import PO_SCHEMA_VERSION
+
+
+def legacy_po(**timestamps):
+    return {
+        "_id": "legacy",
+        "id": "po-1",
+        "po_number": "NA/181025/0001",
+        "po_date": "2025-10-18",
+        "supplier": {"company": "Acme Knits", "address_lines": ["Tiruppur"]},
+        "delivery_date": "2025-11-01",
+        "delivery_terms": "FOB",
+        "payment_terms": "30 days",
+        "order_lines": [{"style_code": "ST1", "product_description": "Tee", "fabric_gsm": "180", "quantity": 5, "unit_price": 0}],
+        "size_colour_breakdown": {"sizes": ["S", "M"], "colors": ["Black"], "values": {"Black": {"S": 2, "M": 3}}, "grand_total": 5},
+        "packing_instructions": {},
+        "other_terms": {},
+        "authorisation": {},
+        **timestamps,
+    }
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2025-10-18T10:00:00", "2025-10-18T10:00:00+00:00"),
+    (datetime(2025, 10, 18, 10, 0), "2025-10-18T10:00:00+00:00"),
+    ("2025-10-18T10:00:00+00:00", "2025-10-18T10:00:00+00:00"),
+    ("2025-10-18T10:00:00Z", "2025-10-18T10:00:00+00:00"),
+    ("2025-10-18T10:00:00+05:30", "2025-10-18T04:30:00+00:00"),
+    ("2025-10-17T22:15:00-04:00", "2025-10-18T02:15:00+00:00"),
+    (datetime(2025, 10, 18, 10, 0, tzinfo=timezone.utc), "2025-10-18T10:00:00+00:00"),
+])
+def test_timestamps_become_utc_iso_strings(value, expected):
+    doc = canonical_po_document(legacy_po(created_at=value, updated_at=value))
+    assert doc["created_at"] == expected
+    assert doc["updated_at"] == expected
+
+
+def test_offset_timestamps_sort_in_time_order():
+    ist = canonical_po_document(legacy_po(created_at="2025-10-18T10:00:00+05:30"))
+    utc = canonical_po_document(legacy_po(created_at="2025-10-18T05:00:00+00:00"))
+    assert ist["created_at"] < utc["created_at"]
+
+
+def test_legacy_document_is_canonicalized():
+    doc = canonical_po_document(legacy_po(created_at="2025-10-18T10:00:00"))
+    assert "_id" not in doc
+    assert doc["doc_type"] == "PO"
+    assert doc["schema_version"] == PO_SCHEMA_VERSION
+    assert doc["size_colour_breakdown"]["colors"] == [{"name": "Black", "unit_price": 0.0}]
+    assert doc["totals"]["total_quantity"] == 5
+    assert "s:acme" in doc["search_keys"]
+
+
+def test_missing_created_at_comes_from_the_object_id():
+    inserted = datetime(2024, 3, 1, 9, 30, tzinfo=timezone.utc)
+    doc = canonical_po_document({**legacy_po(), "_id": ObjectId.from_datetime(inserted)})
+    assert doc["created_at"] == "2024-03-01T09:30:00+00:00"
+    assert datetime.fromisoformat(doc["updated_at"]).utcoffset().total_seconds() == 0
+
+
+def test_missing_timestamps_without_object_id_are_now():
+    before = datetime.now(timezone.utc)
+    doc = canonical_po_document(legacy_po())
+    for field in ("created_at", "updated_at"):
+        assert datetime.fromisoformat(doc[field]) >= before
+        assert datetime.fromisoformat(doc[field]).utcoffset().total_seconds() == 0
+
+
+def test_stored_created_at_wins_over_object_id():
+    doc = canonical_po_document({
+        **legacy_po(created_at="2025-10-18T10:00:00"),
+        "_id": ObjectId.from_datetime(datetime(2024, 3, 1, tzinfo=timezone.utc)),
+    })
+    assert doc["created_at"] == "2025-10-18T10:00:00+00:00"
@@ -0,0 +1,107 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from mongo_lock import LockNotAcquired, MongoLock
+
+
+def as_utc(value):
+    # mongomock hands back BSON dates without tzinfo, like pymongo does by default
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def test_acquire_and_release():
+    async def scenario():
+        locks = AsyncMongoMockClient()['test'].locks
+        lock = MongoLock(locks, "bootstrap", lease_seconds=60)
+        assert await lock.try_acquire()
+        held = await locks.find_one({"_id": "bootstrap"})
+        assert held["owner"] == lock.owner
+        assert as_utc(held["expires_at"]) > datetime.now(timezone.utc) + timedelta(seconds=50)
+
+        await lock.release()
+        assert await locks.find_one({"_id": "bootstrap"}) is None
+        assert lock._renewer is None
+
+    asyncio.run(scenario())
+
+
+def test_held_lock_is_not_acquired_until_released():
+    async def scenario():
+        locks = AsyncMongoMockClient()['test'].locks
+        first = MongoLock(locks, "bootstrap", lease_seconds=60)
+        second = MongoLock(locks, "bootstrap", lease_seconds=60, poll_interval=0.05)
+        await first.acquire()
+
+        assert not await second.try_acquire()
+        with pytest.raises(LockNotAcquired):
+            await second.acquire(timeout=0.2)
+
+        await first.release()
+        await second.acquire(timeout=1)
+        assert (await locks.find_one({"_id": "bootstrap"}))["owner"] == second.owner
+        await second.release()
+
+    asyncio.run(scenario())
+
+
+def test_waiter_gets_the_lock_once_it_is_released():
+    async def scenario():
+        locks = AsyncMongoMockClient()['test'].locks
+        first = MongoLock(locks, "bootstrap")
+        second = MongoLock(locks, "bootstrap", poll_interval=0.05)
+        await first.acquire()
+
+        waiter = asyncio.create_task(second.acquire(timeout=2))
+        await asyncio.sleep(0.15)
+        assert not waiter.done()
+        await first.release()
+        await waiter
+        await second.release()
+
+    asyncio.run(scenario())
+
+
+def test_expired_lease_can_be_taken_over():
+    async def scenario():
+        locks = AsyncMongoMockClient()['test'].locks
+        await locks.insert_one({
+            "_id": "bootstrap",
+            "owner": "crashed-host:1:abcd",
+            "expires_at": datetime.now(timezone.utc) - timedelta(seconds=1)
+        })
+        lock = MongoLock(locks, "bootstrap")
+        assert await lock.try_acquire()
+        await lock.release()
+
+    asyncio.run(scenario())
+
+
+def test_renewal_keeps_a_short_lease_alive():
+    async def scenario():
+        locks = AsyncMongoMockClient()['test'].locks
+        holder = MongoLock(locks, "bootstrap", lease_seconds=0.3)
+        async with holder:
+            # Well past the original lease; renewals every 0.1s keep it held
+            await asyncio.sleep(0.6)
+            held = await locks.find_one({"_id": "bootstrap"})
+            assert held["owner"] == holder.owner
+            assert as_utc(held["expires_at"]) > datetime.now(timezone.utc)
+            assert not await MongoLock(locks, "bootstrap").try_acquire()
+        assert await locks.find_one({"_id": "bootstrap"}) is None
+
+    asyncio.run(scenario())
+
+
+def test_release_leaves_another_owners_lock_alone():
+    async def scenario():
+        locks = AsyncMongoMockClient()['test'].locks
+        holder = MongoLock(locks, "bootstrap")
+        await holder.acquire()
+        await MongoLock(locks, "bootstrap").release()
+        assert (await locks.find_one({"_id": "bootstrap"}))["owner"] == holder.owner
+        await holder.release()
+
+    asyncio.run(scenario())
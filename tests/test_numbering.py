@@ -0,0 +1,150 @@
+import asyncio
+from datetime import datetime, timezone
+
+from mongomock_motor import AsyncMongoMockClient
+
+import server
+from numbering import NumberAllocator, format_number, normalize_prefix, number_date
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def counters():
+    return AsyncMongoMockClient()['test'].counters
+
+
+def test_format_number():
+    assert format_number("NA/", "181025", 7) == "NA/181025/0007"
+    assert format_number("PI", "181025", 12345) == "PI/181025/12345"
+    assert normalize_prefix("NA/") == "NA"
+
+
+def test_number_date_format():
+    assert number_date(datetime(2025, 10, 18, tzinfo=timezone.utc)) == "181025"
+
+
+def test_blocks_are_leased_once_and_handed_out_in_order():
+    collection = counters()
+    allocator = NumberAllocator(collection, block_size=5)
+
+    async def go():
+        numbers = [await allocator.next_number("PO", "NA/", "181025") for _ in range(7)]
+        return numbers, await collection.find_one({"doc_type": "PO"})
+
+    numbers, counter = run(go())
+    assert numbers == [1, 2, 3, 4, 5, 6, 7]
+    # Two blocks of five leased; numbers 8-10 stay with this worker
+    assert counter["seq"] == 10
+
+
+def test_workers_get_disjoint_blocks():
+    collection = counters()
+    first, second = NumberAllocator(collection, 3), NumberAllocator(collection, 3)
+
+    async def go():
+        return [
+            await first.next_number("PO", "NA", "181025"),
+            await second.next_number("PO", "NA", "181025"),
+            await first.next_number("PO", "NA", "181025"),
+        ]
+
+    assert run(go()) == [1, 4, 2]
+
+
+def test_concurrent_allocations_are_unique():
+    allocator = NumberAllocator(counters(), 4)
+
+    async def go():
+        return await asyncio.gather(*(allocator.next_number("PO", "NA", "181025") for _ in range(25)))
+
+    assert sorted(run(go())) == list(range(1, 26))
+
+
+def test_sequences_restart_per_day_prefix_and_doc_type():
+    collection = counters()
+    allocator = NumberAllocator(collection, 10)
+
+    async def go():
+        numbers = [
+            await allocator.next_number("PO", "NA", "181025"),
+            await allocator.next_number("PO", "NA/", "181025"),
+            await allocator.next_number("PO", "NA", "191025"),
+            await allocator.next_number("PO", "XX", "191025"),
+            await allocator.next_number("PI", "NA", "191025"),
+        ]
+        return numbers, await collection.find({}, {"_id": 0, "seq": 0}).to_list(None)
+
+    numbers, keys = run(go())
+    assert numbers == [1, 2, 1, 1, 1]
+    assert sorted((k["doc_type"], k["prefix"], k["date"]) for k in keys) == [
+        ("PI", "NA", "191025"), ("PO", "NA", "181025"), ("PO", "NA", "191025"), ("PO", "XX", "191025"),
+    ]
+    # Leases from earlier days are dropped
+    assert all(key[2] == "191025" for key in allocator._leases)
+
+
+def test_seed_never_moves_the_sequence_back():
+    allocator = NumberAllocator(counters(), 1)
+
+    async def go():
+        await allocator.seed("PO", "NA/", "181025", 41)
+        await allocator.seed("PO", "NA", "181025", 12)
+        return await allocator.next_number("PO", "NA", "181025")
+
+    assert run(go()) == 42
+
+
+def test_legacy_settings_counters_are_seeded_and_removed(monkeypatch):
+    db = AsyncMongoMockClient()['test']
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server.number_allocator, "collection", db.counters)
+    monkeypatch.setattr(server.number_allocator, "_leases", {})
+    monkeypatch.setattr(server.number_allocator, "_lock", asyncio.Lock())
+
+    async def go():
+        await db.settings.insert_one({"_id": "app_settings", "po_prefix": "NA/", "next_po_number": 7, "next_pi_number": 0})
+        migrated = await server.migrate_legacy_counters()
+        again = await server.migrate_legacy_counters()
+        settings = await db.settings.find_one({"_id": "app_settings"})
+        return migrated, again, settings, await server.allocate_number("PO"), await server.allocate_number("PI")
+
+    migrated, again, settings, po, pi = run(go())
+    assert (migrated, again) == (True, False)
+    assert "next_po_number" not in settings and "next_pi_number" not in settings
+    assert po["raw_number"] == 8
+    assert pi["raw_number"] == 1
+
+
+def test_reserve_range_is_contiguous():
+    allocator = NumberAllocator(counters(), 10)
+
+    async def go():
+        return [
+            await allocator.reserve_range("PI", "PI", "181025", 50),
+            await allocator.reserve_range("PI", "PI", "181025", 1),
+            await allocator.reserve_range("PI", "PI", "181025", 3),
+        ]
+
+    assert run(go()) == [(1, 50), (51, 51), (52, 54)]
+
+
+def test_concurrent_ranges_do_not_overlap():
+    allocator = NumberAllocator(counters(), 10)
+
+    async def go():
+        return await asyncio.gather(*(allocator.reserve_range("PO", "NA", "181025", 7) for _ in range(6)))
+
+    numbers = sorted(n for first, last in run(go()) for n in range(first, last + 1))
+    assert numbers == list(range(1, 43))
+
+
+def test_leasing_continues_after_a_reserved_range():
+    allocator = NumberAllocator(counters(), 10)
+
+    async def go():
+        await allocator.reserve_range("PO", "NA", "181025", 20)
+        return await allocator.next_number("PO", "NA", "181025")
+
+    assert run(go()) == 21
@@ -0,0 +1,102 @@
+import pytest
+
+from po_patch import PatchError, apply_patch, parse_pointer
+from server import OrderLine
+
+
+def validate_line(line):
+    return OrderLine(**line).model_dump()
+
+
+def make_po():
+    return {
+        "size_colour_breakdown": {
+            "sizes": ["S", "M", "2.5"],
+            "colors": [{"name": "Black", "unit_price": 100}, {"name": "Grey Mel.", "unit_price": 90}, "Navy/Blue"],
+            "values": {"Black": {"S": 2, "M": 3}},
+        },
+        "order_lines": [
+            {"style_code": "ST1", "product_description": "Tee", "fabric_gsm": "180", "quantity": 5, "unit_price": 0}
+        ],
+    }
+
+
+LINE = {"style_code": "ST2", "product_description": "Polo", "fabric_gsm": "220", "quantity": 8, "unit_price": 12.5}
+
+
+def test_parse_pointer_unescapes_segments():
+    assert parse_pointer("/size_colour_breakdown/values/Navy~1Blue/S") == ["size_colour_breakdown", "values", "Navy/Blue", "S"]
+    assert parse_pointer("/a~0b/~01") == ["a~b", "~1"]
+    assert parse_pointer("/order_lines/-") == ["order_lines", "-"]
+
+
+def test_parse_pointer_requires_leading_slash():
+    with pytest.raises(PatchError):
+        parse_pointer("order_lines/0")
+
+
+def test_cell_replace_and_remove_become_targeted_updates():
+    po = make_po()
+    patched, set_fields, unset_fields = apply_patch(po, [
+        {"op": "replace", "path": "/size_colour_breakdown/values/Black/S", "value": 7},
+        {"op": "add", "path": "/size_colour_breakdown/values/Navy~1Blue/M", "value": 1},
+        {"op": "remove", "path": "/size_colour_breakdown/values/Black/M"},
+    ], validate_line)
+    assert patched["size_colour_breakdown"]["values"] == {"Black": {"S": 7}, "Navy/Blue": {"M": 1}}
+    assert set_fields == {
+        "size_colour_breakdown.values.Black.S": 7,
+        "size_colour_breakdown.values.Navy/Blue.M": 1,
+    }
+    assert unset_fields == {"size_colour_breakdown.values.Black.M"}
+    # The input document is left untouched
+    assert po["size_colour_breakdown"]["values"] == {"Black": {"S": 2, "M": 3}}
+
+
+def test_later_operations_on_a_cell_win():
+    _, set_fields, unset_fields = apply_patch(make_po(), [
+        {"op": "remove", "path": "/size_colour_breakdown/values/Black/S"},
+        {"op": "add", "path": "/size_colour_breakdown/values/Black/S", "value": 4},
+    ], validate_line)
+    assert set_fields == {"size_colour_breakdown.values.Black.S": 4}
+    assert unset_fields == set()
+
+
+def test_append_order_lines():
+    patched, set_fields, _ = apply_patch(make_po(), [
+        {"op": "add", "path": "/order_lines/-", "value": LINE},
+        {"op": "add", "path": "/order_lines/-", "value": dict(LINE, style_code="ST3")},
+    ], validate_line)
+    assert [line["style_code"] for line in patched["order_lines"]] == ["ST1", "ST2", "ST3"]
+    assert set(set_fields) == {"order_lines.1", "order_lines.2"}
+    assert set_fields["order_lines.1"]["unit_price"] == 12.5
+
+
+def test_replace_order_line_field_is_validated():
+    patched, set_fields, _ = apply_patch(make_po(), [
+        {"op": "replace", "path": "/order_lines/0/quantity", "value": "12"},
+    ], validate_line)
+    assert patched["order_lines"][0]["quantity"] == 12
+    assert set_fields["order_lines.0"]["style_code"] == "ST1"
+
+
+@pytest.mark.parametrize("operation, message", [
+    ({"op": "move", "path": "/order_lines/0"}, "Unsupported op"),
+    ({"op": "replace", "path": "/po_number", "value": "X"}, "Unsupported path"),
+    ({"op": "replace", "path": "/size_colour_breakdown/values/Red/S", "value": 1}, "Unknown matrix cell"),
+    ({"op": "replace", "path": "/size_colour_breakdown/values/Black/XL", "value": 1}, "Unknown matrix cell"),
+    ({"op": "replace", "path": "/size_colour_breakdown/values/Black/S", "value": -1}, "non-negative whole"),
+    ({"op": "replace", "path": "/size_colour_breakdown/values/Black/S", "value": 1.5}, "non-negative whole"),
+    ({"op": "replace", "path": "/size_colour_breakdown/values/Black/S", "value": True}, "non-negative whole"),
+    ({"op": "replace", "path": "/size_colour_breakdown/values/Grey Mel./S", "value": 1}, "Unsupported key"),
+    ({"op": "replace", "path": "/size_colour_breakdown/values/Black/2.5", "value": 1}, "Unsupported key"),
+    ({"op": "remove", "path": "/order_lines/0"}, "not supported"),
+    ({"op": "replace", "path": "/order_lines/-", "value": LINE}, "Append order lines"),
+    ({"op": "replace", "path": "/order_lines/3", "value": LINE}, "No order line"),
+    ({"op": "replace", "path": "/order_lines/x", "value": LINE}, "No order line"),
+    ({"op": "add", "path": "/order_lines/-", "value": "ST9"}, "must be objects"),
+    ({"op": "add", "path": "/order_lines/-", "value": {"style_code": "ST9"}}, "Invalid order line 1"),
+    ({"op": "replace", "path": "/order_lines/0/$where", "value": 1}, "Unsupported key"),
+])
+def test_invalid_operations_are_rejected(operation, message):
+    with pytest.raises(PatchError, match=message.replace(".", r"\.")):
+        apply_patch(make_po(), [operation], validate_line)
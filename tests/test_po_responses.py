@@ -0,0 +1,45 @@
+import asyncio
+
+from server import PO_SCHEMA_VERSION, po_response_data
+
+from .test_po_revisions import po_payload
+
+
+def test_legacy_and_current_documents_serialize_timestamps_alike(api, mock_db):
+    current = api.post("/api/pos", json=po_payload()).json()
+    legacy = {
+        **po_payload("NA/181025/0002"),
+        "id": "legacy-po",
+        "created_at": "2025-10-18T10:00:00Z",
+        "updated_at": "2025-10-18T15:30:00+05:30",
+    }
+    asyncio.run(mock_db.purchase_orders.insert_one(legacy))
+
+    listed = {po["id"]: po for po in api.get("/api/pos").json()}
+    assert listed["legacy-po"]["created_at"] == "2025-10-18T10:00:00+00:00"
+    assert listed["legacy-po"]["updated_at"] == "2025-10-18T10:00:00+00:00"
+    assert listed[current["id"]]["created_at"] == current["created_at"]
+    assert current["created_at"].endswith("+00:00")
+    assert api.get("/api/pos/legacy-po").json()["created_at"] == "2025-10-18T10:00:00+00:00"
+
+
+def test_current_documents_pass_through_unchanged():
+    doc = {"id": "po-1", "created_at": "2025-10-18T10:00:00+00:00", "schema_version": PO_SCHEMA_VERSION}
+    assert po_response_data(dict(doc)) == {"id": "po-1", "created_at": "2025-10-18T10:00:00+00:00"}
+
+
+def test_list_is_not_capped(api, mock_db):
+    payload = api.post("/api/pos", json=po_payload()).json()
+    asyncio.run(mock_db.purchase_orders.insert_many([
+        {**payload, "id": f"po-{i}", "po_number": f"NA/181025/{i:05d}", "schema_version": PO_SCHEMA_VERSION}
+        for i in range(1200)
+    ]))
+
+    response = api.get("/api/pos")
+    assert response.headers["content-type"] == "application/json"
+    assert len(response.json()) == 1201
+
+
+def test_empty_list(api):
+    assert api.get("/api/pos").json() == []
+    assert api.get("/api/pos", params={"search": "nothing"}).json() == []
@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+
+
+def po_payload(number="NA/181025/0001", supplier="Acme Knits"):
+    return {
+        "po_number": number,
+        "po_date": "2025-10-18",
+        "bill_to": {"company": "Bill To Co", "address_lines": ["x"]},
+        "buyer": {"company": "Newline Apparel", "address_lines": ["y"]},
+        "supplier": {"company": supplier, "address_lines": ["z"]},
+        "delivery_date": "2025-11-01",
+        "delivery_terms": "FOB",
+        "payment_terms": "30 days",
+        "order_lines": [{"style_code": "ST1", "product_description": "Tee", "fabric_gsm": "180", "quantity": 5, "unit_price": 0}],
+        "size_colour_breakdown": {
+            "sizes": ["S", "M"],
+            "colors": [{"name": "Black", "unitPrice": 100}],
+            "values": {"Black": {"S": 2, "M": 3}},
+            "grand_total": 5,
+        },
+        "packing_instructions": {},
+        "other_terms": {},
+        "authorisation": {},
+        "tax_details": {"cgst_percentage": 2.5, "sgst_percentage": 2.5},
+    }
+
+
+@pytest.fixture
+def po(api):
+    response = api.post("/api/pos", json=po_payload())
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_update_bumps_revision(api, po):
+    response = api.put(f"/api/pos/{po['id']}", json={"payment_terms": "60 days", "revision": 0})
+    assert response.status_code == 200
+    assert response.json()["revision"] == 1
+    assert response.json()["payment_terms"] == "60 days"
+
+    response = api.put(f"/api/pos/{po['id']}", json={"payment_terms": "90 days", "revision": 1})
+    assert response.json()["revision"] == 2
+
+
+def test_stale_revision_is_rejected(api, po):
+    assert api.put(f"/api/pos/{po['id']}", json={"payment_terms": "60 days", "revision": 0}).status_code == 200
+
+    response = api.put(f"/api/pos/{po['id']}", json={"payment_terms": "stale tab", "revision": 0})
+    assert response.status_code == 409
+    assert response.json()["detail"]["current_revision"] == 1
+    assert api.get(f"/api/pos/{po['id']}").json()["payment_terms"] == "60 days"
+
+
+def test_update_without_revision_is_last_write_wins(api, po):
+    api.put(f"/api/pos/{po['id']}", json={"payment_terms": "60 days", "revision": 0})
+    response = api.put(f"/api/pos/{po['id']}", json={"payment_terms": "90 days"})
+    assert response.status_code == 200
+    assert response.json()["revision"] == 2
+
+
+def test_unknown_po_is_404_not_409(api):
+    response = api.put("/api/pos/missing", json={"payment_terms": "60 days", "revision": 3})
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize("stored_revision", [None, "absent"])
+def test_legacy_document_without_revision_counts_as_zero(api, mock_db, po, stored_revision):
+    change = {"$unset": {"revision": ""}} if stored_revision == "absent" else {"$set": {"revision": None}}
+    asyncio.run(mock_db.purchase_orders.update_one({"id": po["id"]}, change))
+
+    response = api.put(f"/api/pos/{po['id']}", json={"payment_terms": "60 days", "revision": 0})
+    assert response.status_code == 200
+    assert response.json()["revision"] == 1
+
+    response = api.put(f"/api/pos/{po['id']}", json={"payment_terms": "90 days", "revision": 0})
+    assert response.status_code == 409
+
+
+def test_partial_update_recomputes_totals_on_the_read_revision(api, po):
+    response = api.put(f"/api/pos/{po['id']}", json={"tax_details": {"igst_percentage": 10}, "revision": 0})
+    assert response.status_code == 200
+    assert response.json()["totals"]["grand_total"] == 550.0
+
+
+CELL = {"op": "replace", "path": "/size_colour_breakdown/values/Black/S", "value": 10}
+
+
+def test_patch_applies_at_current_revision(api, po):
+    response = api.patch(f"/api/pos/{po['id']}", json={"revision": 0, "operations": [CELL]})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["revision"] == 1
+    assert body["totals"]["total_quantity"] == 13
+    stored = api.get(f"/api/pos/{po['id']}").json()
+    assert stored["size_colour_breakdown"]["values"]["Black"] == {"S": 10, "M": 3}
+    assert stored["size_colour_breakdown"]["grand_total"] == 13
+
+
+def test_patch_with_stale_revision_is_rejected(api, po):
+    api.put(f"/api/pos/{po['id']}", json={"payment_terms": "60 days", "revision": 0})
+
+    response = api.patch(f"/api/pos/{po['id']}", json={"revision": 0, "operations": [CELL]})
+    assert response.status_code == 409
+    assert response.json()["detail"]["current_revision"] == 1
+    assert api.get(f"/api/pos/{po['id']}").json()["size_colour_breakdown"]["values"]["Black"]["S"] == 2
+
+
+def test_patch_on_legacy_document_without_revision(api, mock_db, po):
+    asyncio.run(mock_db.purchase_orders.update_one({"id": po["id"]}, {"$unset": {"revision": ""}}))
+    response = api.patch(f"/api/pos/{po['id']}", json={"revision": 0, "operations": [CELL]})
+    assert response.status_code == 200
+    assert response.json()["revision"] == 1
+
+
+def test_patch_errors(api, po):
+    assert api.patch("/api/pos/missing", json={"revision": 0, "operations": [CELL]}).status_code == 404
+    assert api.patch(f"/api/pos/{po['id']}", json={"revision": 0, "operations": []}).status_code == 422
+    bad = {"op": "replace", "path": "/size_colour_breakdown/values/Red/S", "value": 1}
+    assert api.patch(f"/api/pos/{po['id']}", json={"revision": 0, "operations": [bad]}).status_code == 422
@@ -0,0 +1,79 @@
+import pytest
+
+from po_totals import compute_color_rows, compute_po_totals
+
+
+def jsx_tax_summary(matrix, tax_details):
+    """The Tax Details block of PODocument.jsx, transcribed"""
+    subtotal = 0
+    for color in matrix.get('colors') or []:
+        name = color if isinstance(color, str) else color['name']
+        unit_price = 0 if isinstance(color, str) else (color.get('unitPrice') or 0)
+        row_qty = sum(float((matrix.get('values') or {}).get(name, {}).get(size) or 0) for size in matrix['sizes'])
+        subtotal += row_qty * unit_price
+    taxes = {c: subtotal * ((tax_details.get(f"{c}_percentage") or 0) / 100) for c in ('gst', 'cgst', 'sgst', 'igst')}
+    total_tax = sum(taxes.values())
+    return subtotal, taxes, total_tax, subtotal + total_tax
+
+
+def make_po(colors, values, sizes=("S", "M", "L"), tax=None, lines=()):
+    return {
+        "size_colour_breakdown": {"sizes": list(sizes), "colors": colors, "values": values},
+        "tax_details": tax or {},
+        "order_lines": list(lines),
+    }
+
+
+@pytest.mark.parametrize("tax", [
+    {},
+    {"cgst_percentage": 2.5, "sgst_percentage": 2.5},
+    {"igst_percentage": 5},
+    {"gst_percentage": 12, "cgst_percentage": 6, "sgst_percentage": 6, "igst_percentage": 0.25},
+])
+def test_totals_match_document_tax_formula(tax):
+    colors = [{"name": "Black", "unitPrice": 145.5}, {"name": "Grey Mel", "unitPrice": 99.99}, {"name": "Navy", "unitPrice": 0}]
+    values = {"Black": {"S": 12, "M": 30, "L": 7}, "Grey Mel": {"S": 3, "L": 41}, "Navy": {"M": 5}}
+    totals = compute_po_totals(make_po(colors, values, tax=tax))
+
+    subtotal, taxes, total_tax, net_total = jsx_tax_summary({"sizes": ["S", "M", "L"], "colors": colors, "values": values}, tax)
+    assert totals['subtotal'] == pytest.approx(subtotal, abs=0.01)
+    for component, amount in taxes.items():
+        assert totals[f"{component}_amount"] == pytest.approx(amount, abs=0.01)
+    assert totals['total_tax'] == pytest.approx(total_tax, abs=0.02)
+    assert totals['grand_total'] == pytest.approx(net_total, abs=0.02)
+
+
+def test_quantities_and_size_totals():
+    po = make_po(
+        [{"name": "Black", "unit_price": 10}, {"name": "White", "unit_price": 20}],
+        {"Black": {"S": 1, "M": 2, "L": 3}, "White": {"S": 4, "XL": 100}},
+        lines=[{"quantity": 6}, {"quantity": "4"}, {}]
+    )
+    totals = compute_po_totals(po)
+    assert totals['total_quantity'] == 10
+    assert totals['order_lines_quantity'] == 10
+    # Cells outside the size list are ignored, as in the rendered matrix
+    assert totals['size_totals'] == {"S": 5, "M": 2, "L": 3}
+    assert totals['subtotal'] == 140.0
+    assert totals['grand_total'] == 140.0
+
+
+def test_legacy_string_colours_have_no_price():
+    rows = compute_color_rows({"sizes": ["S"], "colors": ["Red"], "values": {"Red": {"S": 9}}})
+    assert rows == [{"name": "Red", "quantity": 9, "unit_price": 0.0, "amount": 0.0}]
+
+
+def test_empty_document():
+    totals = compute_po_totals({})
+    assert totals['total_quantity'] == 0
+    assert totals['size_totals'] == {}
+    assert totals['grand_total'] == 0.0
+
+
+def test_amounts_are_rounded_to_paise():
+    totals = compute_po_totals(make_po(
+        [{"name": "A", "unitPrice": 33.333}], {"A": {"S": 3}}, tax={"cgst_percentage": 2.5, "sgst_percentage": 2.5}
+    ))
+    assert totals['color_rows'][0]['amount'] == 100.0
+    assert totals['cgst_amount'] == 2.5
+    assert totals['grand_total'] == 105.0
@@ -0,0 +1,48 @@
+from server import SEARCH_PREFIX_MAX, build_po_query, build_search_keys, search_tokens
+
+
+def test_prefixes_are_namespaced_by_field():
+    keys = build_search_keys("NA/181025/0007", "Acme Knits")
+    assert "n:na" in keys and "n:1810" in keys and "n:0007" in keys
+    assert "s:a" in keys and "s:acme" in keys and "s:knits" in keys
+    # A supplier token never matches a number search and vice versa
+    assert "n:acme" not in keys and "s:na" not in keys
+
+
+def test_every_prefix_of_every_token():
+    keys = build_search_keys(None, "Sree Rajkondal")
+    assert {f"s:{'sree'[:i]}" for i in range(1, 5)} <= set(keys)
+    assert {f"s:{'rajkondal'[:i]}" for i in range(1, 10)} <= set(keys)
+    assert keys == sorted(set(keys))
+
+
+def test_tokens_are_casefolded_and_accent_free():
+    assert search_tokens("Café_Überwear  Pvt. Ltd") == ["cafe", "uberwear", "pvt", "ltd"]
+    assert "s:cafe" in build_search_keys(None, "CAFÉ")
+
+
+def test_prefix_length_is_capped():
+    keys = build_search_keys(None, "x" * (SEARCH_PREFIX_MAX + 10))
+    assert max(len(k) for k in keys) == len("s:") + SEARCH_PREFIX_MAX
+
+
+def test_missing_values_give_no_keys():
+    assert build_search_keys(None, None) == []
+    assert build_search_keys("", " / ") == []
+
+
+def test_query_combines_search_and_supplier_filter():
+    assert build_po_query("NA/18", "Acme") == {"$and": [
+        {"search_keys": {"$in": ["n:na", "s:na"]}},
+        {"search_keys": {"$in": ["n:18", "s:18"]}},
+        {"search_keys": "s:acme"},
+    ]}
+    assert build_po_query("", None) == {}
+    assert build_po_query(None, "acme") == {"search_keys": "s:acme"}
+
+
+def test_query_matches_stored_keys():
+    keys = set(build_search_keys("NA/181025/0007", "Acme Knits"))
+    for clause in build_po_query("na 0007", "knit")["$and"]:
+        wanted = clause["search_keys"]
+        assert (set(wanted["$in"]) if isinstance(wanted, dict) else {wanted}) & keys